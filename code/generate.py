@@ -1,36 +1,133 @@
+import argparse
+import contextlib
+import functools
+import io
+import multiprocessing
+import os
+from statistics import NormalDist
+
 import numpy as np
 import pandas as pd
 
-rng = np.random.RandomState(42)
+# Rows per independently seeded block. The data only depends on the seed,
+# the parameters and this block size, never on the number of workers.
+BLOCK_ROWS = 1 << 16
+
+
+def block_rng(seed, k):
+    # Block k always gets the same child of the seed sequence
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(1, k)))
+
+
+def make_hyperplane(seed, n_features, balance, noise):
+    # Create a random separating hyperplane (true weights and intercept)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0,)))
+    true_coef = rng.normal(scale=1.0, size=n_features)
+    if balance is None:
+        true_intercept = -0.2  # shift to control class balance
+    else:
+        # X ~ N(0, I), so the noisy score is N(b, |w|^2 + noise^2): pick b
+        # so that a `balance` fraction of the samples are positive
+        spread = np.sqrt(true_coef.dot(true_coef) + noise ** 2)
+        true_intercept = float(spread * NormalDist().inv_cdf(balance))
+    return true_coef, true_intercept
+
+
+def generate_block(k, n_samples, block_rows, true_coef, true_intercept, noise, seed, npy_paths):
+    rng = block_rng(seed, k)
+    rows = min(block_rows, n_samples - k * block_rows)
+
+    # Generate features
+    X = rng.normal(size=(rows, true_coef.shape[0]))
+
+    # Make data more separable by scaling projection noise
+    linear_score = X.dot(true_coef) + true_intercept
+    # Add small noise to keep near-separable but still numeric-stable
+    y = (linear_score + rng.normal(scale=noise, size=rows) > 0).astype(np.int8)
+    mis = int(np.sum((linear_score > 0) != y))
+
+    if npy_paths is not None:
+        # Each worker writes its rows straight into the memory-mapped files
+        start = k * block_rows
+        X_out = np.load(npy_paths[0], mmap_mode="r+")
+        y_out = np.load(npy_paths[1], mmap_mode="r+")
+        X_out[start:start + rows] = X
+        y_out[start:start + rows] = y
+        X_out.flush()
+        y_out.flush()
+        return mis, None, None, int(y.sum())
+
+    x_csv, y_csv = io.StringIO(), io.StringIO()
+    pd.DataFrame(X).to_csv(x_csv, index=False, header=False)
+    pd.DataFrame(y).to_csv(y_csv, index=False, header=False)
+    return mis, x_csv.getvalue(), y_csv.getvalue(), int(y.sum())
 
-n_samples = 200
-n_features = 8
 
-# Create a random separating hyperplane (true weights and intercept)
-true_coef = rng.normal(scale=1.0, size=n_features)
-true_intercept = -0.2  # shift to control class balance
+def generate(n_samples, n_features, balance, noise, seed, x_path, y_path, coeffs_path,
+             workers=None, block_rows=BLOCK_ROWS):
+    true_coef, true_intercept = make_hyperplane(seed, n_features, balance, noise)
+    n_blocks = (n_samples + block_rows - 1) // block_rows
 
-# Generate features
-X = rng.normal(size=(n_samples, n_features))
+    npy = x_path.endswith(".npy")
+    npy_paths = None
+    if npy:
+        # Preallocated on disk; workers fill their own row ranges
+        np.lib.format.open_memmap(x_path, mode="w+", dtype=np.float64, shape=(n_samples, n_features))
+        np.lib.format.open_memmap(y_path, mode="w+", dtype=np.int8, shape=(n_samples,))
+        npy_paths = (x_path, y_path)
+    block = functools.partial(
+        generate_block, n_samples=n_samples, block_rows=block_rows, true_coef=true_coef,
+        true_intercept=true_intercept, noise=noise, seed=seed, npy_paths=npy_paths,
+    )
 
-# Make data more separable by scaling projection noise
-linear_score = X.dot(true_coef) + true_intercept
-# Add small noise to keep near-separable but still numeric-stable
-noise = rng.normal(scale=0.1, size=n_samples)
-y = (linear_score + noise > 0).astype(int)
+    workers = workers or os.cpu_count() or 1
+    mis = positives = 0
+    with contextlib.ExitStack() as stack:
+        x_fs = y_fs = None
+        if not npy:
+            x_fs = stack.enter_context(open(x_path, "w", newline=""))
+            y_fs = stack.enter_context(open(y_path, "w", newline=""))
+        pool = stack.enter_context(multiprocessing.Pool(workers))
+        # A window of a few blocks per worker at a time keeps memory bounded
+        window = 4 * workers
+        for first in range(0, n_blocks, window):
+            for block_mis, x_csv, y_csv, block_pos in pool.map(block, range(first, min(first + window, n_blocks))):
+                mis += block_mis
+                positives += block_pos
+                if x_fs is not None:
+                    x_fs.write(x_csv)
+                    y_fs.write(y_csv)
 
-# Verify separability (optional)
-# If any misclassified by true hyperplane, reduce noise or scale true_coef
-mis = np.sum((X.dot(true_coef) + true_intercept > 0) != y)
-print(f"Misclassified by true hyperplane: {mis} / {n_samples}")
+    # Save coefficients in the real_coeffs.txt format: bias, then weights
+    with open(coeffs_path, "w") as f:
+        f.write(" ".join(map(str, [true_intercept] + list(true_coef))))
+    return mis, positives
 
-# Save feature matrix and labels
-pd.DataFrame(X).to_csv("X.csv", index=False, header=False)
-pd.DataFrame(y, columns=["y"]).to_csv("y.csv", index=False, header=False)
 
-# Save coefficients: first line coefficients, second line intercept
-with open("coeffs.txt", "w") as f:
-    f.write(" ".join(map(str, true_coef)) + "\n")
-    f.write(str(true_intercept) + "\n")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a near-separable logistic dataset.")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--features", type=int, default=8)
+    parser.add_argument("--balance", type=float, default=None,
+                        help="fraction of positive samples (default: intercept -0.2)")
+    parser.add_argument("--noise", type=float, default=0.1, help="std. dev. of the label noise")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--block-rows", type=int, default=BLOCK_ROWS)
+    parser.add_argument("--x", default="X.csv", help="features, .csv or .npy")
+    parser.add_argument("--y", default="y.csv", help="labels, .csv or .npy")
+    parser.add_argument("--coeffs", default="coeffs.txt")
+    args = parser.parse_args()
+    if args.x.endswith(".npy") != args.y.endswith(".npy"):
+        parser.error("--x and --y must both be .npy or both be CSV")
+    if args.balance is not None and not 0.0 < args.balance < 1.0:
+        parser.error("--balance must be between 0 and 1")
 
-print("Saved X.csv, y.csv, coeffs.txt")
+    mis, positives = generate(
+        args.samples, args.features, args.balance, args.noise, args.seed,
+        args.x, args.y, args.coeffs, args.workers, args.block_rows,
+    )
+    # If many are misclassified by the true hyperplane, reduce the noise
+    print(f"Misclassified by true hyperplane: {mis} / {args.samples}")
+    print(f"Positive samples: {positives / args.samples:.3f}")
+    print(f"Saved {args.x}, {args.y}, {args.coeffs}")
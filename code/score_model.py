@@ -0,0 +1,174 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import argparse, collections, concurrent.futures, io, os, sys, time
+import numpy, pandas
+
+'''
+Reads a coefficients file: the bias followed by the weights, as in
+real_coeffs.txt
+'''
+def read_coeffs( fname ):
+  with open( fname ) as coeffs_fs:
+    coeffs = [ float( v ) for v in coeffs_fs.read( ).split( ) ]
+  # end with
+  return coeffs[ 0 ], numpy.ascontiguousarray( coeffs[ 1 : ], dtype = numpy.float64 )
+# end def
+
+'''
+Logistic function without overflow: exp is only taken of -|z|
+'''
+def stable_sigmoid( z ):
+  e = numpy.exp( -numpy.abs( z ) )
+  return numpy.where( z >= 0, 1.0 / ( 1.0 + e ), e / ( 1.0 + e ) )
+# end def
+
+'''
+Probabilities and labels for a ( rows, features ) block. The score is
+b + X w, the hyperplane of generate.py; test_model.py evaluates X w - b
+( see --legacy-bias ).
+'''
+def score_block( X, b, w ):
+  X = numpy.ascontiguousarray( X, dtype = numpy.float64 )
+  zp = stable_sigmoid( X @ w + b )
+  return zp, ( zp >= 0.5 ).astype( numpy.int8 )
+# end def
+
+'''
+Blocks of whole CSV lines, about block_bytes each
+'''
+def csv_blocks( fname, block_bytes ):
+  with open( fname, 'rb' ) as in_fs:
+    rest = b''
+    while True:
+      data = in_fs.read( block_bytes )
+      if not data:
+        break
+      # end if
+      data = rest + data
+      cut = data.rfind( b'\n' ) + 1
+      rest = data[ cut : ]
+      if cut > 0:
+        yield data[ : cut ]
+      # end if
+    # end while
+    if rest.strip( ):
+      yield rest + b'\n'
+    # end if
+  # end with
+# end def
+
+'''
+Row slices of a .npy feature matrix, memory mapped
+'''
+def npy_blocks( fname, chunk_rows ):
+  X = numpy.load( fname, mmap_mode = 'r' )
+  for start in range( 0, X.shape[ 0 ], chunk_rows ):
+    yield X[ start : start + chunk_rows ]
+  # end for
+# end def
+
+def score_csv_block( block, b, w ):
+  X = pandas.read_csv( io.BytesIO( block ), sep = ',', header = None, dtype = numpy.float64 ).to_numpy( )
+  return format_block( *score_block( X, b, w ) )
+# end def
+
+def format_block( zp, yp ):
+  out = io.StringIO( )
+  pandas.DataFrame( { 'p': zp, 'y': yp } ).to_csv(
+    out, index = False, header = False, float_format = '%.9g'
+    )
+  return out.getvalue( ).encode( )
+# end def
+
+'''
+Scores every block with a pool of threads ( NumPy and the pandas parser
+release the GIL ) and writes the results in input order. At most
+2 x threads blocks are in flight, so memory does not grow with the input.
+'''
+def score_file( blocks, score, out_fs, threads ):
+  rows = 0
+  with concurrent.futures.ThreadPoolExecutor( max_workers = threads ) as pool:
+    pending = collections.deque( )
+    for block in blocks:
+      pending.append( pool.submit( score, block ) )
+      if len( pending ) >= 2 * threads:
+        rows += write_result( pending.popleft( ).result( ), out_fs )
+      # end if
+    # end for
+    while len( pending ) > 0:
+      rows += write_result( pending.popleft( ).result( ), out_fs )
+    # end while
+  # end with
+  return rows
+# end def
+
+def write_result( result, out_fs ):
+  out_fs.write( result )
+  return result.count( b'\n' )
+# end def
+
+'''
+Binary in, binary out: probabilities of a .npy feature matrix written
+straight into a memory-mapped .npy, without any text parsing or formatting
+'''
+def score_npy( features, output, b, w, chunk_rows, threads ):
+  X = numpy.load( features, mmap_mode = 'r' )
+  out = numpy.lib.format.open_memmap( output, mode = 'w+', dtype = numpy.float64, shape = ( X.shape[ 0 ], ) )
+  def score_into( start ):
+    out[ start : start + chunk_rows ] = score_block( X[ start : start + chunk_rows ], b, w )[ 0 ]
+  # end def
+  with concurrent.futures.ThreadPoolExecutor( max_workers = threads ) as pool:
+    list( pool.map( score_into, range( 0, X.shape[ 0 ], chunk_rows ) ) )
+  # end with
+  out.flush( )
+  return X.shape[ 0 ]
+# end def
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser( description = 'Stream a feature file through a logistic model.' )
+  parser.add_argument( 'coeffs', help = 'bias followed by the weights' )
+  parser.add_argument( 'features', help = 'headerless CSV or .npy ( memory mapped ) feature matrix' )
+  parser.add_argument(
+    'output', help = 'CSV of probability,label rows, or .npy of probabilities ( .npy features only )'
+    )
+  parser.add_argument( '--chunk-rows', type = int, default = 1 << 16, help = 'rows per .npy block' )
+  parser.add_argument( '--block-mb', type = float, default = 8.0, help = 'megabytes per CSV block' )
+  parser.add_argument( '--threads', type = int, default = os.cpu_count( ) or 1 )
+  parser.add_argument(
+    '--legacy-bias', action = 'store_true',
+    help = 'evaluate X w - b, as test_model.py does'
+    )
+  args = parser.parse_args( )
+
+  b, w = read_coeffs( args.coeffs )
+  if args.legacy_bias:
+    b = -b
+  # end if
+  start = time.perf_counter( )
+  if args.output.endswith( '.npy' ):
+    if not args.features.endswith( '.npy' ):
+      parser.error( '.npy output needs .npy features' )
+    # end if
+    rows = score_npy( args.features, args.output, b, w, args.chunk_rows, max( args.threads, 1 ) )
+  else:
+    if args.features.endswith( '.npy' ):
+      blocks = npy_blocks( args.features, args.chunk_rows )
+      score = lambda X: format_block( *score_block( X, b, w ) )
+    else:
+      blocks = csv_blocks( args.features, int( args.block_mb * ( 1 << 20 ) ) )
+      score = lambda block: score_csv_block( block, b, w )
+    # end if
+    with open( args.output, 'wb' ) as out_fs:
+      rows = score_file( blocks, score, out_fs, max( args.threads, 1 ) )
+    # end with
+  # end if
+  seconds = time.perf_counter( ) - start
+  print(
+    f'{rows} rows scored in {seconds:.2f} s ( {rows / seconds:.0f} rows/s )', file = sys.stderr
+    )
+# end if
+
+## eof - score_model.py
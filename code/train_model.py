@@ -0,0 +1,223 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import argparse, time
+import numpy, pandas
+
+'''
+Feature matrix and labels: .npy files are memory mapped, CSV files are
+read whole ( a first line that is not numeric is taken as a header, as in
+the bot's game_x.csv / game_y.csv )
+'''
+def load_matrix( fname ):
+  if fname.endswith( '.npy' ):
+    return numpy.load( fname, mmap_mode = 'r' )
+  # end if
+  with open( fname ) as in_fs:
+    first = in_fs.readline( ).strip( ).split( ',' )
+  # end with
+  try:
+    [ float( v ) for v in first ]
+    header = None
+  except ValueError:
+    header = 0
+  # end try
+  return pandas.read_csv( fname, sep = ',', header = header ).to_numpy( dtype = numpy.float64 )
+# end def
+
+'''
+Row blocks of ( X, y ) as contiguous float64 arrays with a leading column of
+ones, so the bias is the first coefficient
+'''
+def blocks( X, y, chunk_rows, order = None ):
+  starts = range( 0, X.shape[ 0 ], chunk_rows )
+  if order is not None:
+    starts = [ starts[ k ] for k in order ]
+  # end if
+  for start in starts:
+    Xb = numpy.ones( ( min( chunk_rows, X.shape[ 0 ] - start ), X.shape[ 1 ] + 1 ) )
+    Xb[ :, 1 : ] = X[ start : start + chunk_rows ]
+    yield Xb, numpy.asarray( y[ start : start + chunk_rows ], dtype = numpy.float64 ).reshape( -1 )
+  # end for
+# end def
+
+def log_loss_terms( z, y ):
+  # log( 1 + exp( z ) ) - y z, without overflow
+  return numpy.logaddexp( 0.0, z ) - y * z
+# end def
+
+def sigmoid( z ):
+  return 0.5 * ( 1.0 + numpy.tanh( 0.5 * z ) )
+# end def
+
+'''
+Objective of sklearn's LogisticRegression( C = 1 / l2 ): summed log-loss
+plus l2 / 2 |w|^2, the bias not penalized
+'''
+def objective( X, y, theta, l2, chunk_rows ):
+  loss = 0.0
+  for Xb, yb in blocks( X, y, chunk_rows ):
+    loss += log_loss_terms( Xb @ theta, yb ).sum( )
+  # end for
+  return loss + 0.5 * l2 * theta[ 1 : ] @ theta[ 1 : ]
+# end def
+
+'''
+Newton / IRLS: gradient and Hessian accumulated block by block, so the
+memory use is O( chunk_rows x features ) whatever the number of rows.
+Halves the step while the objective does not decrease.
+'''
+def fit_newton( X, y, l2, chunk_rows, max_iter, tol, report ):
+  d = X.shape[ 1 ] + 1
+  theta = numpy.zeros( d )
+  penalty = numpy.full( d, l2 )
+  penalty[ 0 ] = 0.0
+  loss = objective( X, y, theta, l2, chunk_rows )
+  for it in range( 1, max_iter + 1 ):
+    grad = penalty * theta
+    hess = numpy.diag( penalty )
+    for Xb, yb in blocks( X, y, chunk_rows ):
+      p = sigmoid( Xb @ theta )
+      grad += Xb.T @ ( p - yb )
+      hess += ( Xb * ( p * ( 1.0 - p ) )[ :, None ] ).T @ Xb
+    # end for
+    step = numpy.linalg.solve( hess + 1e-10 * numpy.eye( d ), grad )
+    t = 1.0
+    while True:
+      new_loss = objective( X, y, theta - t * step, l2, chunk_rows )
+      if new_loss <= loss or t < 1e-8:
+        break
+      # end if
+      t *= 0.5
+    # end while
+    theta = theta - t * step
+    change = loss - new_loss
+    loss = new_loss
+    report( it, loss, numpy.abs( grad ).max( ) )
+    if numpy.abs( t * step ).max( ) < tol or change <= tol * max( abs( loss ), 1.0 ):
+      break
+    # end if
+  # end for
+  return theta
+# end def
+
+'''
+Mini-batch Adam on the same objective, scaled by 1 / rows. Batches are
+contiguous row blocks in a shuffled order, friendly to memory-mapped
+inputs.
+'''
+def fit_minibatch( X, y, l2, batch_rows, epochs, learning_rate, tol, seed, report ):
+  n = X.shape[ 0 ]
+  d = X.shape[ 1 ] + 1
+  theta = numpy.zeros( d )
+  m = numpy.zeros( d )
+  v = numpy.zeros( d )
+  beta1, beta2, eps = 0.9, 0.999, 1e-8
+  rng = numpy.random.default_rng( seed )
+  n_batches = ( n + batch_rows - 1 ) // batch_rows
+  step = 0
+  previous = None
+  for epoch in range( 1, epochs + 1 ):
+    loss = 0.0
+    for Xb, yb in blocks( X, y, batch_rows, rng.permutation( n_batches ) ):
+      z = Xb @ theta
+      loss += log_loss_terms( z, yb ).sum( )
+      # Mean log-loss of the batch plus its share of the penalty: the
+      # gradient of objective / n in expectation
+      grad = Xb.T @ ( sigmoid( z ) - yb ) / yb.shape[ 0 ]
+      grad[ 1 : ] += l2 * theta[ 1 : ] / n
+      step += 1
+      m = beta1 * m + ( 1.0 - beta1 ) * grad
+      v = beta2 * v + ( 1.0 - beta2 ) * grad * grad
+      m_hat = m / ( 1.0 - beta1 ** step )
+      v_hat = v / ( 1.0 - beta2 ** step )
+      theta -= learning_rate * m_hat / ( numpy.sqrt( v_hat ) + eps )
+    # end for
+    # Loss seen during the epoch ( the model moved while it was summed )
+    loss += 0.5 * l2 * theta[ 1 : ] @ theta[ 1 : ]
+    report( epoch, loss, numpy.abs( m_hat ).max( ) )
+    if previous is not None and abs( previous - loss ) <= tol * max( abs( loss ), 1.0 ):
+      break
+    # end if
+    previous = loss
+  # end for
+  return theta
+# end def
+
+'''
+Accuracy and precision of the 0.5 threshold, block by block
+'''
+def metrics( X, y, theta, chunk_rows ):
+  correct = predicted = true_positives = 0
+  for Xb, yb in blocks( X, y, chunk_rows ):
+    yp = ( Xb @ theta ) >= 0.0
+    correct += int( ( yp == ( yb > 0.5 ) ).sum( ) )
+    predicted += int( yp.sum( ) )
+    true_positives += int( ( yp & ( yb > 0.5 ) ).sum( ) )
+  # end for
+  return correct / X.shape[ 0 ], true_positives / predicted if predicted > 0 else 0.0
+# end def
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(
+    description = 'Fit a logistic model with NumPy and write a bias/weights coefficients file.'
+    )
+  parser.add_argument( 'features', help = 'CSV ( optional header ) or .npy feature matrix' )
+  parser.add_argument( 'labels', help = 'CSV ( optional header ) or .npy labels' )
+  parser.add_argument( 'coeffs', help = 'output: bias followed by the weights, as real_coeffs.txt' )
+  parser.add_argument(
+    '--solver', choices = ( 'auto', 'newton', 'minibatch' ), default = 'auto',
+    help = 'auto: Newton up to 10^7 rows and 100 features, mini-batch above'
+    )
+  parser.add_argument( '--l2', type = float, default = 1.0, help = '1 / C of sklearn ( 0: none )' )
+  parser.add_argument( '--chunk-rows', type = int, default = 1 << 16 )
+  parser.add_argument( '--max-iter', type = int, default = 50, help = 'Newton iterations' )
+  parser.add_argument( '--epochs', type = int, default = 20 )
+  parser.add_argument( '--batch-rows', type = int, default = 4096 )
+  parser.add_argument( '--learning-rate', type = float, default = 0.05 )
+  parser.add_argument( '--tol', type = float, default = 1e-8 )
+  parser.add_argument( '--seed', type = int, default = 0 )
+  args = parser.parse_args( )
+
+  start = time.perf_counter( )
+  X = load_matrix( args.features )
+  y = load_matrix( args.labels ).reshape( -1 )
+  if X.ndim == 1:
+    X = X.reshape( -1, 1 )
+  # end if
+  if X.shape[ 0 ] != y.shape[ 0 ]:
+    parser.error( f'{X.shape[ 0 ]} feature rows but {y.shape[ 0 ]} labels' )
+  # end if
+  print( f'{X.shape[ 0 ]} rows, {X.shape[ 1 ]} features, loaded in {time.perf_counter( ) - start:.2f} s' )
+
+  solver = args.solver
+  if solver == 'auto':
+    solver = 'newton' if X.shape[ 0 ] <= 10 ** 7 and X.shape[ 1 ] <= 100 else 'minibatch'
+  # end if
+  fit_start = time.perf_counter( )
+  def report( it, loss, gradient ):
+    print(
+      f'{solver} {it:4d}: objective {loss:.10g} max|grad| {gradient:.3e}'
+      f' {time.perf_counter( ) - fit_start:.2f} s'
+      )
+  # end def
+  if solver == 'newton':
+    theta = fit_newton( X, y, args.l2, args.chunk_rows, args.max_iter, args.tol, report )
+  else:
+    theta = fit_minibatch(
+      X, y, args.l2, args.batch_rows, args.epochs, args.learning_rate, args.tol, args.seed, report
+      )
+  # end if
+  seconds = time.perf_counter( ) - fit_start
+
+  accuracy, precision = metrics( X, y, theta, args.chunk_rows )
+  print( f'Fitted in {seconds:.2f} s, accuracy {accuracy:.4f}, precision {precision:.4f}' )
+  with open( args.coeffs, 'w' ) as coeffs_fs:
+    coeffs_fs.write( ' '.join( repr( float( v ) ) for v in theta ) )
+  # end with
+  print( 'Saved', args.coeffs )
+# end if
+
+## eof - train_model.py
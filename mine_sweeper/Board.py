@@ -6,8 +6,12 @@
 ## =========================================================================
 
 import random
-import csv
-import os
+from collections import deque
+
+import numpy
+
+from Features import cell_features
+from PlayRecorder import CsvPlayRecorder
 
 class Board:
 
@@ -15,73 +19,175 @@ class Board:
   m_Mines         = None
   m_NumberOfMines = 0
   m_Explosion     = False
+  m_Unrevealed    = 0
 
-  def __init__( self, w, h, n, record_play_data = True ):
-    self.m_Patches = [ [ False for j in range( h ) ] for i in range( w ) ]
-    self.m_Mines = [ [ 0 for j in range( h ) ] for i in range( w ) ]
+  def __init__(
+    self, w, h, n, record_play_data = True, layout = None, recorder = None, seed = None
+    ):
     self.m_NumberOfMines = n
     self.m_Explosion = False
     self.m_PlayHistory = []
     self.m_PlayDataWritten = False
     self.m_RecordPlayData = record_play_data
+    self.m_Recorder = recorder
     self.m_PlayCount = 0
 
-    # Randomly choose mine locations
-    t = [ i for i in range( w * h ) ]
-    random.shuffle( t )
-    for i in t[ 0: n ]:
-      self.m_Mines[ int( i / w ) ][ i % w ] = 9
-    # end for
+    if layout is None:
+      # Randomly choose mine locations; without an explicit seed the
+      # generator is seeded from the global random module
+      if seed is None:
+        seed = random.getrandbits( 64 )
+      # end if
+      rng = numpy.random.default_rng( seed )
+      layout = Board._generate_layouts( rng, 1, w, h, n )[ 0 ]
+    elif layout.shape != ( w, h ):
+      raise ValueError( f'Layout shape {layout.shape} does not match a {w}x{h} board' )
+    # end if
+
+    # Layouts coming from generate_many are wrapped, not copied
+    self.m_Mines = layout
+    self.m_Patches = self._new_patches( w, h )
+    self.m_Unrevealed = w * h
+
+    # Lines of the full drawing ( see render ), rows redrawn when a click
+    # touches them
+    self.m_RowCache = None
+    self.m_DirtyRows = set( )
+  # end def
+
+  def _new_patches( self, w, h ):
+    # Revealed flags, indexed as [ i, j ]; subclasses may store them
+    # differently
+    return numpy.zeros( ( w, h ), dtype = bool )
+  # end def
+
+  def storage( self ):
+    # How the board is stored, enough to build the same one again ( see
+    # Replay.new_board )
+    return { 'kind': 'dense' }
+  # end def
+
+  def revealed_mask( self ):
+    # ( w, h ) bool array of the revealed cells
+    return self.m_Patches
+  # end def
+
+  @staticmethod
+  def generate_many( count, w, h, n, seed = None ):
+    '''
+    Stacked ( count, w, h ) int8 layouts (counts, 9 for mines) drawn from
+    a single RNG call; the same seed always gives the same layouts.
+    '''
+    rng = numpy.random.default_rng( seed )
+    return Board._generate_layouts( rng, count, w, h, n )
+  # end def
+
+  @staticmethod
+  def _generate_layouts( rng, count, w, h, n ):
+    # The n cells with the smallest random keys of each board are mines
+    mines = numpy.zeros( ( count, w * h ), dtype = bool )
+    if n > 0:
+      keys = rng.random( ( count, w * h ), dtype = numpy.float32 )
+      chosen = numpy.argpartition( keys, n - 1, axis = 1 )[ :, : n ]
+      numpy.put_along_axis( mines, chosen, True, axis = 1 )
+    # end if
 
     # Fill the remaining cells with the count of neighboring mines
-    for i in range( len( self.m_Mines ) ):
-      for j in range( len( self.m_Mines[ i ] ) ):
-        if self.m_Mines[ i ][ j ] == 0:
-          for k in range( i - 1, i + 2 ):
-            if k >= 0 and k < len( self.m_Mines ):
-              for l in range( j - 1, j + 2 ):
-                if l >= 0 and l < len( self.m_Mines[ i ] ):
-                  if self.m_Mines[ k ][ l ] == 9:
-                    self.m_Mines[ i ][ j ] += 1
-                  # end if
-                # end if
-              # end for
-            # end if
-          # end for
+    return Board._count_neighbors( mines.reshape( count, w, h ) )
+  # end def
+
+  @staticmethod
+  def _count_neighbors( mines ):
+    # Shifted sum over the 3x3 window of the last two axes of a boolean
+    # mine mask, mines are marked with 9
+    w, h = mines.shape[ -2 : ]
+    pad = [ ( 0, 0 ) ] * ( mines.ndim - 2 ) + [ ( 1, 1 ), ( 1, 1 ) ]
+    padded = numpy.pad( mines, pad ).astype( numpy.int8 )
+    counts = numpy.zeros( mines.shape, dtype = numpy.int8 )
+    for k in range( 3 ):
+      for l in range( 3 ):
+        if k != 1 or l != 1:
+          counts += padded[ ..., k : k + w, l : l + h ]
         # end if
       # end for
     # end for
-
+    counts[ mines ] = 9
+    return counts
   # end def
 
   def __str__( self ):
-    s = '    '
-    for k in range( len( self.m_Mines ) ):
-      s += '+---'
-    s += '+\n    '
-    for k in range( len( self.m_Mines ) ):
-      s += '| ' + str( k ) + ' '
-    s += '|\n'
-    for j in range( len( self.m_Mines[ 0 ] ) ):
-      for k in range( len( self.m_Mines ) + 1 ):
-        s += '+---'
-      s += '+\n'
-      s += '| ' + chr( ord( 'A' ) + j ) + ' '
-      for i in range( len( self.m_Mines ) ):
-        s += '| '
-        if self.m_Patches[ i ][ j ]:
-          if self.m_Mines[ i ][ j ] < 9:
-            s += str( self.m_Mines[ i ][ j ] )
-          else:
-            s += 'X'
-        else:
-          s += ' '
-        s += ' '
-      s += '|\n'
-    for k in range( len( self.m_Mines ) + 1 ):
-      s += '+---'
-    s += '+\n'
-    return s
+    return self.render( )
+  # end def
+
+  def render( self, i0 = 0, j0 = 0, width = None, height = None ):
+    '''
+    ASCII drawing of the board, or of the width x height window starting
+    at column i0 and row j0. Full drawings reuse the lines cached since the
+    last call and only redraw the rows changed by clicks.
+    '''
+    w = self.width( )
+    h = self.height( )
+    i0 = min( max( i0, 0 ), w - 1 )
+    j0 = min( max( j0, 0 ), h - 1 )
+    i1 = w if width is None else min( i0 + max( width, 1 ), w )
+    j1 = h if height is None else min( j0 + max( height, 1 ), h )
+    if ( i0, j0, i1, j1 ) == ( 0, 0, w, h ):
+      return '\n'.join( self._cached_lines( ) )
+    # end if
+    return '\n'.join( self._frame( i0, i1, [ self._render_row( j, i0, i1 ) for j in range( j0, j1 ) ] ) )
+  # end def
+
+  def _frame( self, i0, i1, rows ):
+    # Column header, rows between separators and a final empty line, so
+    # the joined text ends with a newline
+    separator = '+---' * ( i1 - i0 + 1 ) + '+'
+    lines = [
+      '    ' + '+---' * ( i1 - i0 ) + '+',
+      '    ' + ''.join( '| ' + str( k ) + ' ' for k in range( i0, i1 ) ) + '|'
+      ]
+    for row in rows:
+      lines.append( separator )
+      lines.append( row )
+    # end for
+    lines.append( separator )
+    lines.append( '' )
+    return lines
+  # end def
+
+  def _cached_lines( self ):
+    # Row j is line 2 * j + 3 of the full drawing
+    w = self.width( )
+    if self.m_RowCache is None:
+      self.m_RowCache = self._frame( 0, w, [ self._render_row( j, 0, w ) for j in range( self.height( ) ) ] )
+    else:
+      for j in self.m_DirtyRows:
+        self.m_RowCache[ 2 * j + 3 ] = self._render_row( j, 0, w )
+      # end for
+    # end if
+    self.m_DirtyRows.clear( )
+    return self.m_RowCache
+  # end def
+
+  def _render_row( self, j, i0, i1 ):
+    # Once a mine explodes the whole board is shown as revealed
+    values = self._row_values( j, i0, i1 )
+    if self.m_Explosion:
+      shown = values
+    else:
+      shown = [
+        v if r else None for v, r in zip( values, self._row_revealed( j, i0, i1 ) )
+        ]
+    # end if
+    cells = [ ' ' if v is None else ( 'X' if v == 9 else str( v ) ) for v in shown ]
+    return '| ' + chr( ord( 'A' ) + j ) + ' | ' + ' | '.join( cells ) + ' |'
+  # end def
+
+  def _row_values( self, j, i0, i1 ):
+    return self.m_Mines[ i0 : i1, j ].tolist( )
+  # end def
+
+  def _row_revealed( self, j, i0, i1 ):
+    return self.m_Patches[ i0 : i1, j ].tolist( )
   # end def
 
   def __repr__( self ):
@@ -89,7 +195,7 @@ class Board:
   # end def
 
   def width( self ):
-    return len( self.m_Mines )
+    return self.m_Mines.shape[ 0 ]
   # end def
 
   def number_of_mines( self ):
@@ -97,19 +203,11 @@ class Board:
   # end def
 
   def height( self ):
-    if len( self.m_Mines ) > 0:
-      return len( self.m_Mines[ 0 ] )
-    else:
-      return 0
+    return self.m_Mines.shape[ 1 ]
   # end def
 
   def have_won( self ):
-    c = 0
-    for i in range( len( self.m_Mines ) ):
-      for j in range( len( self.m_Mines[ i ] ) ):
-        if not self.m_Patches[ i ][ j ]:
-          c += 1
-    return c == self.m_NumberOfMines
+    return not self.m_Explosion and self.m_Unrevealed == self.m_NumberOfMines
   # end def
 
   def have_lose( self ):
@@ -120,77 +218,96 @@ class Board:
     return self.have_won( ) or self.have_lose( )
   # end def
 
-  def click( self, i, j ):
+  def click( self, i, j, cascade = False ):
+    '''
+    Reveals ( i, j ) and returns its value. With cascade = True, zero
+    regions are flood filled in the same call and the list of every
+    newly revealed ( i, j, value ) is returned, clicked cell first.
+    '''
     if not self.m_Explosion:
       if i < 0 or j < 0 or i >= self.width( ) or j >= self.height( ):
-        return 0
+        return [ ] if cascade else 0
       else:
         self.m_PlayCount += 1
-        new_reveal = False
-        if not self.m_Patches[ i ][ j ]:
-          self.m_Patches[ i ][ j ] = True
-          new_reveal = True
-        if new_reveal:
-          self._record_play( i, j )
-        if self.m_Mines[ i ][ j ] == 9:
+        value = int( self.m_Mines[ i, j ] )
+        revealed = [ ( i, j, value ) ]
+        if not self.m_Patches[ i, j ]:
+          self._reveal( i, j )
+          if cascade and value == 0:
+            revealed += self._flood_fill( i, j )
+        if value == 9:
+          # The whole board is shown as revealed once a mine explodes
           self.m_Explosion = True
-          self.m_Patches = [ [ True for j in range( self.height( ) ) ] for i in range( self.width( ) ) ]
+          self.m_RowCache = None
         if self.have_finished( ):
           self.save_play_data( )
-        return self.m_Mines[ i ][ j ]
+        return revealed if cascade else value
     else:
       self.m_PlayCount += 1
-      return self.m_Mines[ i ][ j ]
+      value = int( self.m_Mines[ i, j ] )
+      return [ ( i, j, value ) ] if cascade else value
+  # end def
+
+  def _reveal( self, i, j ):
+    self.m_Patches[ i, j ] = True
+    self.m_Unrevealed -= 1
+    self.m_DirtyRows.add( j )
+    self._record_play( i, j )
+  # end def
+
+  def _flood_fill( self, i, j ):
+    # Iterative BFS over the zero region connected to ( i, j )
+    w = self.width( )
+    h = self.height( )
+    revealed = [ ]
+    queue = deque( [ ( i, j ) ] )
+    while len( queue ) > 0:
+      ci, cj = queue.popleft( )
+      for x in range( max( ci - 1, 0 ), min( ci + 2, w ) ):
+        for y in range( max( cj - 1, 0 ), min( cj + 2, h ) ):
+          if not self.m_Patches[ x, y ]:
+            self._reveal( x, y )
+            value = int( self.m_Mines[ x, y ] )
+            revealed.append( ( x, y, value ) )
+            if value == 0:
+              queue.append( ( x, y ) )
+            # end if
+          # end if
+        # end for
+      # end for
+    # end while
+    return revealed
   # end def
   
   def _record_play( self, i, j ):
-    value = self.m_Mines[ i ][ j ]
-    neighbors = self._collect_neighbors( i, j )
-    self.m_PlayHistory.append( ( i, j, value, neighbors ) )
-  # end def
-
-  def _collect_neighbors( self, i, j ):
-    neighbors = []
-    for x in range( i - 1, i + 2 ):
-      for y in range( j - 1, j + 2 ):
-        if x == i and y == j:
-          continue
-        if x >= 0 and x < self.width( ) and y >= 0 and y < self.height( ):
-          neighbors.append( self.m_Mines[ x ][ y ] )
-        else:
-          neighbors.append( 9 )
-    return neighbors
-  # end def
-
-  def save_play_data(self):
-    if not self.m_RecordPlayData or len(self.m_PlayHistory) == 0:
+    # Features are extracted for all the plays at once when saving
+    self.m_PlayHistory.append( ( i, j, int( self.m_Mines[ i, j ] ) ) )
+  # end def
+
+  def _play_features( self, cells_i, cells_j ):
+    # 3 x 3 windows of the layout around the played cells, in the
+    # n1..n8 order, 9 outside the board
+    return cell_features( self.m_Mines, cells_i, cells_j )
+  # end def
+
+  def save_play_data( self ):
+    if not self.m_RecordPlayData or len( self.m_PlayHistory ) == 0:
       return
 
-    filename_x = f'game_x.csv'
-    filename_y = f'game_y.csv'
-
-    # Check if files already exist to avoid writing duplicated headers
-    file_exists_x = os.path.exists(filename_x)
-    file_exists_y = os.path.exists(filename_y)
-
-    # Save X (neighbor configurations)
-    with open(filename_x, 'a', newline='') as fx:
-      writer_x = csv.writer(fx)
-      if not file_exists_x:
-        writer_x.writerow([f"n{i}" for i in range(1, 9)])
-      for play in self.m_PlayHistory:
-        neighbors = play[3]
-        writer_x.writerow(neighbors)
-
-    # Save Y (whether a mine was found)
-    with open(filename_y, 'a', newline='') as fy:
-      writer_y = csv.writer(fy)
-      if not file_exists_y:
-        writer_y.writerow(["mina_encontrada"])
-      for play in self.m_PlayHistory:
-        valor = play[2]
-        y = 1 if valor == 9 else 0
-        writer_y.writerow([y])
+    # One record per play: neighbor configuration followed by the label
+    # ( whether a mine was found )
+    plays = numpy.array( self.m_PlayHistory, dtype = numpy.int64 )
+    records = numpy.empty( ( plays.shape[ 0 ], 9 ), dtype = numpy.int64 )
+    records[ :, : 8 ] = self._play_features( plays[ :, 0 ], plays[ :, 1 ] )
+    records[ :, 8 ] = plays[ :, 2 ] == 9
+    records = records.tolist( )
+    if self.m_Recorder is None:
+      with CsvPlayRecorder( ) as recorder:
+        recorder.write( records )
+      # end with
+    else:
+      self.m_Recorder.write( records )
+    # end if
 
     self.m_PlayDataWritten = True
   # end def
@@ -3,54 +3,378 @@
 ## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
 ## =========================================================================
 
+import argparse
+import contextlib
 import csv
+import json
+import multiprocessing
 import os
+import random
 import subprocess
 import sys
+import time
+import tracemalloc
 
-GAME_CMD = ["python3", "MineSweeper.py", "8", "8", "5"]
+from Board import Board
+from CompactBoard import CompactBoard
+from Instrumentation import Instrumentation
+from MineSweeper import ImportLibrary
+from PlayRecorder import BinaryPlayRecorder, CsvPlayRecorder, MemoryPlayRecorder
+from Replay import ReplayLog, make_record
+
+GAME_SIZE = (8, 8, 5)
+GAME_CMD = ["python3", "MineSweeper.py"] + [str(v) for v in GAME_SIZE]
 PLAYERS = [
     ("LogisticRegressionBot", "Player/LogisticRegressionBot.py"),
     ("RandomBot", "Player/Random.py"),
+    ("ConstraintSolver", "Player/ConstraintSolver.py"),
 ]
 RESULT_FILE = "benchmark_results.csv"
 PER_RUN_FILE = "benchmark_runs.csv"
+LATENCY_FILE = "benchmark_latency.csv"
+MEMORY_FILE = "benchmark_memory.csv"
+SUITE_FILE = "benchmark_suite.csv"
+SUITE_SUMMARY_FILE = "benchmark_suite_summary.csv"
+SUITE_SIZES = "8x8,16x16,32x32,100x100,500x500"
+SUITE_DENSITIES = "0.05,0.10,0.15,0.20,0.25"
+SUITE_FIELDS = [
+    "player", "width", "height", "mines", "density", "test", "seed",
+    "won", "plays", "moves", "seconds", "mean_move_us",
+]
+SUITE_SUMMARY_FIELDS = [
+    "player", "width", "height", "mines", "density", "games",
+    "win_rate", "plays_per_game", "games_per_sec", "mean_move_us",
+]
+
+# Player module loaded once per worker process by _init_worker
+_WORKER_PLAYER_LIB = None
+_WORKER_PLAYER_PATH = None
 
 
-def extract_metric(output, marker):
-    idx = output.rfind(marker)
-    if idx == -1:
-        return None
-    line = output[idx + len(marker):].splitlines()[0].strip()
+def run_game(cmd, cwd):
+    # MineSweeper.py --headless prints a single JSON result line
+    completed = subprocess.run(cmd + ["--headless"], capture_output=True, text=True, cwd=cwd)
+    # A crashed or misbehaving player is an error, not a lost game
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"{' '.join(cmd)} exited with code {completed.returncode}:\n{completed.stderr}"
+        )
+    lines = completed.stdout.strip().splitlines()
     try:
-        return float(line)
-    except ValueError:
-        return None
+        outcome = json.loads(lines[-1])
+    except (IndexError, ValueError):
+        raise RuntimeError(
+            f"{' '.join(cmd)} did not print a JSON result:\n{completed.stdout}{completed.stderr}"
+        ) from None
 
+    plays = outcome["plays"]
+    wins = 1 if outcome["result"] == "won" else 0
+    losses = 1 - wins
+    result = "victoria" if wins else "derrota"
+    return plays, wins, losses, result, outcome.get("accuracy"), outcome.get("precision")
 
-def run_game(cmd, cwd):
-    completed = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd)
-    output = completed.stdout
-
-    plays = 0
-    marker = "Plays made:"
-    idx = output.rfind(marker)
-    if idx != -1:
-        line = output[idx + len(marker):].splitlines()[0].strip()
-        try:
-            plays = int(line)
-        except ValueError:
-            plays = 0
+
+def _init_worker(player_path):
+    global _WORKER_PLAYER_LIB, _WORKER_PLAYER_PATH
+    _WORKER_PLAYER_PATH = player_path
+    # Forked workers inherit the parent's random state; reseed them so
+    # they do not all replay the same games.
+    random.seed()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        _WORKER_PLAYER_LIB = ImportLibrary("Player", player_path)
+    if _WORKER_PLAYER_LIB is None:
+        raise RuntimeError(f"Could not load player module {player_path}")
+
+
+def play_game(task):
+    width, height, mines = task["width"], task["height"], task["mines"]
+    recorder = MemoryPlayRecorder() if task["record"] else None
+    profile = Instrumentation() if task["instrument"] else None
+    if task["trace_memory"]:
+        tracemalloc.start()
+    # Every game gets explicit board and player seeds, drawn here when the
+    # run is not seeded, so any game can be replayed from its log record
+    seed = task["seed"] if task["seed"] is not None else random.getrandbits(32)
+    player_args = list(task["player_args"]) + ["--seed", str(seed)]
+    clicks = []
+    clock = time.perf_counter
+    game_start = clock()
+    moves = 0
+    move_seconds = 0.0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        board_class = CompactBoard if task["compact"] else Board
+        board = board_class(
+            width, height, mines, record_play_data=task["record"], recorder=recorder, seed=seed
+        )
+        player = _WORKER_PLAYER_LIB.Player(player_args)
+        if profile is not None:
+            _instrument(profile, player, board)
+        while not board.have_finished():
+            start = clock()
+            i, j = player.choose_cell(width, height, mines)
+            clicks.append((i, j))
+            if task["cascade"]:
+                for x, y, n in board.click(i, j, cascade=True):
+                    player.report(x, y, n)
+            else:
+                n = board.click(i, j)
+                player.report(i, j, n)
+            elapsed = clock() - start
+            moves += 1
+            move_seconds += elapsed
+            if profile is not None:
+                profile.add("move", elapsed)
+    game_seconds = clock() - game_start
+    peak_memory_kb = None
+    if task["trace_memory"]:
+        peak_memory_kb = tracemalloc.get_traced_memory()[1] / 1024.0
+        tracemalloc.stop()
+    won = board.have_won()
+    replay = None
+    if task["replay"]:
+        replay = make_record(
+            board, seed, _WORKER_PLAYER_PATH, task["player_args"], seed, task["cascade"], clicks
+        )
+    return {
+        "test": task["test"],
+        "plays": board.play_count(),
+        "won": won,
+        "result": "victoria" if won else "derrota",
+        "accuracy": getattr(player, "m_ModelAccuracy", None),
+        "precision": getattr(player, "m_ModelPrecision", None),
+        "seed": seed,
+        "moves": moves,
+        "seconds": game_seconds,
+        "mean_move_us": move_seconds / moves * 1e6 if moves > 0 else 0.0,
+        "peak_memory_kb": peak_memory_kb,
+        "records": [] if recorder is None else recorder.take(),
+        "profile": profile,
+        "replay": replay,
+    }
+
+
+def _instrument(profile, player, board):
+    # Timing hooks on the calls of one game; "player.inference" is the part
+    # of choose_cell/report spent scoring cells with the model
+    for name in ("choose_cell", "report"):
+        profile.wrap(player, name, f"player.{name}")
+    if hasattr(player, "_score_cells"):
+        profile.wrap(player, "_score_cells", "player.inference")
+    for name in ("click", "have_won", "save_play_data"):
+        profile.wrap(board, name, f"Board.{name}")
+
+
+def run_benchmark(
+    player_path,
+    number_tests,
+    game_size=GAME_SIZE,
+    player_args=(),
+    workers=None,
+    cascade=False,
+    recorder=None,
+    profile=None,
+    trace_memory=False,
+    base_seed=None,
+    replay_log=None,
+    compact=False,
+):
+    """Plays number_tests games and returns one result dict per game.
+
+    When a recorder is given, the play records of every game are sent back
+    to this process and written through it, so a single writer owns the
+    dataset files no matter how many workers are used. When an
+    Instrumentation is given as profile, every game is timed and its
+    histograms are merged into it; trace_memory adds the tracemalloc peak
+    of each game to its result. With a base_seed, game k is seeded with
+    base_seed + k, so runs are reproducible and comparable across players.
+    Given a ReplayLog, the seeds and clicks of every game are logged to it.
+    compact plays on CompactBoard instead of Board.
+    """
+    width, height, mines = game_size
+    tasks = [
+        {
+            "test": test_index,
+            "width": width,
+            "height": height,
+            "mines": mines,
+            "player_args": tuple(player_args),
+            "cascade": cascade,
+            "record": recorder is not None,
+            "instrument": profile is not None,
+            "trace_memory": trace_memory,
+            "seed": None if base_seed is None else base_seed + test_index,
+            "replay": replay_log is not None,
+            "compact": compact,
+        }
+        for test_index in range(1, number_tests + 1)
+    ]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, number_tests))
+
+    per_run_rows = []
+    if workers == 1:
+        _init_worker(player_path)
+        games = map(play_game, tasks)
+        _collect_games(games, per_run_rows, recorder, profile, replay_log)
     else:
-        plays = output.count("Cell =")
+        chunksize = max(1, number_tests // (workers * 8))
+        with multiprocessing.Pool(
+            workers, initializer=_init_worker, initargs=(player_path,)
+        ) as pool:
+            games = pool.imap(play_game, tasks, chunksize=chunksize)
+            _collect_games(games, per_run_rows, recorder, profile, replay_log)
+    return per_run_rows
 
-    wins = 1 if "You won!" in output else 0
-    losses = 1 if "You lose :-(" in output else 0
-    result = "victoria" if wins else "derrota"
 
-    accuracy = extract_metric(output, "[LogisticRegressionBot] Accuracy:")
-    precision = extract_metric(output, "[LogisticRegressionBot] Precision:")
-    return plays, wins, losses, result, accuracy, precision
+def _collect_games(games, per_run_rows, recorder, profile, replay_log):
+    for row in games:
+        records = row.pop("records")
+        if recorder is not None:
+            recorder.write(records)
+        game_profile = row.pop("profile")
+        if profile is not None:
+            profile.merge(game_profile)
+        replay = row.pop("replay")
+        if replay_log is not None:
+            replay_log.write(replay)
+        per_run_rows.append(row)
+
+
+def run_benchmark_subprocess(
+    player_path, number_tests, base_dir, cascade=False, compact=False, base_seed=None,
+    replay_log_path=None,
+):
+    cmd = GAME_CMD + [player_path, "--no-save-data"]
+    if cascade:
+        cmd.append("--cascade")
+    if compact:
+        cmd.append("--compact")
+    if replay_log_path is not None:
+        # Every child appends its own game to the log
+        cmd += ["--replay-log", os.path.abspath(replay_log_path)]
+    per_run_rows = []
+    for test_index in range(1, number_tests + 1):
+        game_cmd = cmd
+        if base_seed is not None:
+            # Same seeds as the in-process engine: game k uses base_seed + k
+            seed = str(base_seed + test_index)
+            game_cmd = cmd + ["--board-seed", seed, "--seed", seed]
+        plays, wins, losses, result, accuracy, precision = run_game(game_cmd, base_dir)
+        per_run_rows.append(
+            {
+                "test": test_index,
+                "plays": plays,
+                "won": bool(wins),
+                "result": result,
+                "accuracy": accuracy,
+                "precision": precision,
+            }
+        )
+    return per_run_rows
+
+
+def parse_sizes(text):
+    sizes = []
+    for item in text.split(","):
+        width, height = item.lower().split("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def run_suite(
+    players, sizes, densities, games, base_seed, workers=None, cascade=False, replay_log=None,
+    compact=False,
+):
+    """Plays games per (player, size, density) configuration.
+
+    Returns one tidy row per game and one summary row per configuration.
+    Seeds only depend on the configuration and the game index, so every
+    player sees the same boards.
+    """
+    game_rows = []
+    summary_rows = []
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for config_index, ((width, height), density) in enumerate(
+        (size, density) for size in sizes for density in densities
+    ):
+        mines = min(width * height - 1, max(1, round(width * height * density)))
+        config_seed = base_seed + config_index * games
+        for player_name, player_path in players:
+            start = time.perf_counter()
+            per_run_rows = run_benchmark(
+                os.path.join(base_dir, player_path),
+                games,
+                game_size=(width, height, mines),
+                workers=workers,
+                cascade=cascade,
+                base_seed=config_seed,
+                replay_log=replay_log,
+                compact=compact,
+            )
+            wall_seconds = time.perf_counter() - start
+            config = {
+                "player": player_name,
+                "width": width,
+                "height": height,
+                "mines": mines,
+                "density": density,
+            }
+            for row in per_run_rows:
+                game_rows.append(dict(config, **{k: row[k] for k in SUITE_FIELDS if k in row}))
+            summary_rows.append(
+                dict(
+                    config,
+                    games=games,
+                    win_rate=sum(row["won"] for row in per_run_rows) / games,
+                    plays_per_game=sum(row["plays"] for row in per_run_rows) / games,
+                    games_per_sec=games / wall_seconds,
+                    mean_move_us=sum(row["mean_move_us"] for row in per_run_rows) / games,
+                )
+            )
+            print(
+                f"{player_name} {width}x{height} {mines} mines: "
+                f"win rate {summary_rows[-1]['win_rate']:.3f}, "
+                f"{summary_rows[-1]['games_per_sec']:.1f} games/s"
+            )
+    return game_rows, summary_rows
+
+
+def write_tidy(rows, fields, path):
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def summarize(player_name, per_run_rows):
+    stats = {
+        "Tipo de jugador": player_name,
+        "numero de pruebas": len(per_run_rows),
+        "numero de jugadas": 0,
+        "derrotas": 0,
+        "victorias": 0,
+        "metrics_count": 0,
+        "accuracy_sum": 0.0,
+        "precision_sum": 0.0,
+    }
+    for row in per_run_rows:
+        stats["numero de jugadas"] += row["plays"]
+        if row["won"]:
+            stats["victorias"] += 1
+        else:
+            stats["derrotas"] += 1
+        if row["accuracy"] is not None and row["precision"] is not None:
+            stats["accuracy_sum"] += row["accuracy"]
+            stats["precision_sum"] += row["precision"]
+            stats["metrics_count"] += 1
+    if stats["metrics_count"] > 0:
+        stats["avg_accuracy"] = stats["accuracy_sum"] / stats["metrics_count"]
+        stats["avg_precision"] = stats["precision_sum"] / stats["metrics_count"]
+    else:
+        stats["avg_accuracy"] = ""
+        stats["avg_precision"] = ""
+    return stats
 
 
 def write_results(rows, path):
@@ -99,55 +423,180 @@ def write_per_run(base_dir, player_name, per_run_rows):
             )
 
 
+def write_latency(profiles, path):
+    fields = ["call", "count", "total_s", "mean_us", "p50_us", "p95_us", "p99_us", "max_us"]
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["player"] + fields)
+        for player_name, profile in profiles:
+            for row in profile.summary():
+                writer.writerow([player_name] + [row[field] for field in fields])
+
+
+def write_memory(memory_rows, path):
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["player", "games", "mean_peak_kb", "max_peak_kb"])
+        for player_name, peaks in memory_rows:
+            writer.writerow([player_name, len(peaks), sum(peaks) / len(peaks), max(peaks)])
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python3", sys.argv[0], "number_tests")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Benchmark the MineSweeper players.")
+    parser.add_argument("number_tests", type=int)
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="worker processes for the in-process engine (default: one per core)",
+    )
+    parser.add_argument(
+        "--subprocess", action="store_true",
+        help="run every game as a separate MineSweeper.py process (legacy mode)",
+    )
+    parser.add_argument(
+        "--cascade", action="store_true",
+        help="let the board flood fill zero regions in a single click",
+    )
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="play on CompactBoard (bit-packed revealed state) instead of Board",
+    )
+    parser.add_argument(
+        "--instrument", action="store_true",
+        help=f"time every move and hot call, write {LATENCY_FILE}",
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help=f"track the peak memory of every game with tracemalloc, write {MEMORY_FILE}",
+    )
+    parser.add_argument(
+        "--suite", action="store_true",
+        help=f"play number_tests seeded games per size/density configuration, write {SUITE_FILE}",
+    )
+    parser.add_argument(
+        "--sizes", default=SUITE_SIZES, help="suite board sizes, e.g. 8x8,16x16",
+    )
+    parser.add_argument(
+        "--densities", default=SUITE_DENSITIES, help="suite mine densities, e.g. 0.05,0.1",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="base seed of the games (the suite defaults to 0)",
+    )
+    parser.add_argument(
+        "--replay-log", metavar="PATH",
+        help="append the seeds and clicks of every game to a replay log (see Replay.py)",
+    )
+    parser.add_argument(
+        "--players", default=None,
+        help="comma separated player names to benchmark (default: all)",
+    )
+    recording = parser.add_mutually_exclusive_group()
+    recording.add_argument(
+        "--record-data", action="store_true",
+        help="append the plays of every game to game_x.csv / game_y.csv",
+    )
+    recording.add_argument(
+        "--record-binary", metavar="PATH",
+        help="append the plays of every game to a binary record file",
+    )
+    args = parser.parse_args()
+    if args.players:
+        known = [name for name, path in PLAYERS]
+        unknown = [name for name in args.players.split(",") if name not in known]
+        if unknown:
+            parser.error(
+                f"unknown players {', '.join(unknown)} (choose from {', '.join(known)})"
+            )
+    if args.suite and args.subprocess:
+        parser.error("--suite is not supported with --subprocess")
+    if args.subprocess:
+        # Child processes only report a result line: nothing to collect these from
+        for flag, value in (
+            ("--instrument", args.instrument),
+            ("--trace-memory", args.trace_memory),
+            ("--record-data", args.record_data),
+            ("--record-binary", args.record_binary),
+        ):
+            if value:
+                parser.error(f"{flag} is not supported with --subprocess")
 
-    number_tests = int(sys.argv[1])
+    number_tests = args.number_tests
     base_dir = os.path.dirname(os.path.abspath(__file__))
+    players = PLAYERS
+    if args.players:
+        wanted = args.players.split(",")
+        players = [(name, path) for name, path in PLAYERS if name in wanted]
+
+    # Subprocess games append to the replay log themselves
+    replay_log = ReplayLog(args.replay_log) if args.replay_log and not args.subprocess else None
+
+    if args.suite:
+        game_rows, summary_rows = run_suite(
+            players,
+            parse_sizes(args.sizes),
+            [float(d) for d in args.densities.split(",")],
+            number_tests,
+            0 if args.seed is None else args.seed,
+            workers=args.workers,
+            cascade=args.cascade,
+            replay_log=replay_log,
+            compact=args.compact,
+        )
+        if replay_log is not None:
+            replay_log.close()
+        write_tidy(game_rows, SUITE_FIELDS, os.path.join(base_dir, SUITE_FILE))
+        write_tidy(summary_rows, SUITE_SUMMARY_FIELDS, os.path.join(base_dir, SUITE_SUMMARY_FILE))
+        sys.exit(0)
     results = []
+    profiles = []
+    memory_rows = []
 
-    for player_name, player_path in PLAYERS:
-        stats = {
-            "Tipo de jugador": player_name,
-            "numero de pruebas": number_tests,
-            "numero de jugadas": 0,
-            "derrotas": 0,
-            "victorias": 0,
-            "metrics_count": 0,
-            "accuracy_sum": 0.0,
-            "precision_sum": 0.0,
-        }
-        cmd = GAME_CMD + [player_path, "--no-save-data"]
-        per_run_rows = []
-        for test_index in range(1, number_tests + 1):
-            plays, wins, losses, result, accuracy, precision = run_game(cmd, base_dir)
-            stats["numero de jugadas"] += plays
-            stats["victorias"] += wins
-            stats["derrotas"] += losses
-            per_run_rows.append(
-                {
-                    "test": test_index,
-                    "plays": plays,
-                    "result": result,
-                    "accuracy": accuracy,
-                    "precision": precision,
-                }
+    recorder = None
+    if args.record_data:
+        recorder = CsvPlayRecorder()
+    elif args.record_binary:
+        recorder = BinaryPlayRecorder(args.record_binary)
+
+    for player_name, player_path in players:
+        if args.subprocess:
+            per_run_rows = run_benchmark_subprocess(
+                player_path,
+                number_tests,
+                base_dir,
+                cascade=args.cascade,
+                compact=args.compact,
+                base_seed=args.seed,
+                replay_log_path=args.replay_log,
+            )
+        else:
+            profile = Instrumentation() if args.instrument else None
+            per_run_rows = run_benchmark(
+                os.path.join(base_dir, player_path),
+                number_tests,
+                workers=args.workers,
+                cascade=args.cascade,
+                recorder=recorder,
+                profile=profile,
+                trace_memory=args.trace_memory,
+                base_seed=args.seed,
+                replay_log=replay_log,
+                compact=args.compact,
             )
-            if accuracy is not None and precision is not None:
-                stats["accuracy_sum"] += accuracy
-                stats["precision_sum"] += precision
-                stats["metrics_count"] += 1
-        results.append(stats)
+            if profile is not None:
+                profiles.append((player_name, profile))
+            if args.trace_memory:
+                memory_rows.append((player_name, [row["peak_memory_kb"] for row in per_run_rows]))
+        results.append(summarize(player_name, per_run_rows))
         write_per_run(base_dir, player_name, per_run_rows)
 
+    if recorder is not None:
+        recorder.close()
+    if replay_log is not None:
+        replay_log.close()
+
     output_path = os.path.join(base_dir, RESULT_FILE)
-    for entry in results:
-        if entry["metrics_count"] > 0:
-            entry["avg_accuracy"] = entry["accuracy_sum"] / entry["metrics_count"]
-            entry["avg_precision"] = entry["precision_sum"] / entry["metrics_count"]
-        else:
-            entry["avg_accuracy"] = ""
-            entry["avg_precision"] = ""
     write_results(results, output_path)
+    if profiles:
+        write_latency(profiles, os.path.join(base_dir, LATENCY_FILE))
+    if memory_rows:
+        write_memory(memory_rows, os.path.join(base_dir, MEMORY_FILE))
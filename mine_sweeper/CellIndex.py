@@ -0,0 +1,70 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+"""
+Set of the unrevealed cells of a w x h board with O( 1 ) removal and
+O( 1 ) uniform sampling: the cells are kept in a virtual list, the
+unrevealed ones first, and a removed cell is swapped with the last
+unrevealed one. Only the positions that moved are stored ( a cell k,
+numbered i * h + j, starts at position k ), so building the index costs
+nothing and its memory grows with the cells removed, not with the board.
+"""
+class CellIndex:
+
+  '''
+  '''
+  m_Height = 0
+  m_Count = 0
+  m_Cells = None
+  m_Positions = None
+
+  def __init__( self, w, h ):
+    self.m_Height = h
+    self.m_Count = w * h
+    # position -> cell and cell -> position, where they differ from k -> k
+    self.m_Cells = {}
+    self.m_Positions = {}
+  # end def
+
+  def __len__( self ):
+    return self.m_Count
+  # end def
+
+  def __contains__( self, cell ):
+    k = cell[ 0 ] * self.m_Height + cell[ 1 ]
+    return self.m_Positions.get( k, k ) < self.m_Count
+  # end def
+
+  def remove( self, i, j ):
+    # False if ( i, j ) was already removed
+    cell = i * self.m_Height + j
+    position = self.m_Positions.get( cell, cell )
+    if position >= self.m_Count:
+      return False
+    # end if
+    self.m_Count -= 1
+    last = self.m_Count
+    moved = self.m_Cells.get( last, last )
+    # The last unrevealed cell takes the place of the removed one, which
+    # goes just past the end of the unrevealed cells
+    self.m_Cells[ position ] = moved
+    self.m_Positions[ moved ] = position
+    self.m_Cells[ last ] = cell
+    self.m_Positions[ cell ] = last
+    return True
+  # end def
+
+  def sample( self, rng ):
+    # Uniformly chosen unrevealed ( i, j ), None if there are none left
+    if self.m_Count == 0:
+      return None
+    # end if
+    k = rng.randrange( self.m_Count )
+    return divmod( self.m_Cells.get( k, k ), self.m_Height )
+  # end def
+
+# end class
+
+## eof - CellIndex.py
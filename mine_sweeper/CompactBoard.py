@@ -0,0 +1,121 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import numpy
+
+from Board import Board
+
+"""
+One bit per cell, row major over ( i, j ), in a bytearray.
+"""
+class PackedBits:
+
+  '''
+  '''
+  shape = None
+
+  m_Bits = None
+
+  def __init__( self, w, h, bits = None ):
+    self.shape = ( w, h )
+    self.m_Bits = bytearray( ( w * h + 7 ) // 8 ) if bits is None else bytearray( bits )
+  # end def
+
+  def __getitem__( self, key ):
+    k = key[ 0 ] * self.shape[ 1 ] + key[ 1 ]
+    return ( ( self.m_Bits[ k >> 3 ] >> ( k & 7 ) ) & 1 ) == 1
+  # end def
+
+  def __setitem__( self, key, value ):
+    k = key[ 0 ] * self.shape[ 1 ] + key[ 1 ]
+    if value:
+      self.m_Bits[ k >> 3 ] |= 1 << ( k & 7 )
+    else:
+      self.m_Bits[ k >> 3 ] &= ~( 1 << ( k & 7 ) ) & 0xFF
+    # end if
+  # end def
+
+  def to_array( self ):
+    # Unpacked ( w, h ) bool copy
+    w, h = self.shape
+    return numpy.unpackbits(
+      numpy.frombuffer( self.m_Bits, dtype = numpy.uint8 ), count = w * h, bitorder = 'little'
+      ).view( bool ).reshape( w, h )
+  # end def
+
+  def tolist( self ):
+    return self.to_array( ).tolist( )
+  # end def
+
+# end class
+
+"""
+Board with compact state: the int8 layout is never copied ( boards built
+from Board.generate_many share it, read-only ) and the revealed flags take
+one bit per cell. Pickling sends the layout and the bits as raw bytes, so
+boards move cheaply between worker processes.
+"""
+class CompactBoard( Board ):
+
+  '''
+  '''
+
+  def __init__(
+    self, w, h, n, record_play_data = True, layout = None, recorder = None, seed = None
+    ):
+    super( ).__init__(
+      w, h, n, record_play_data = record_play_data, layout = layout,
+      recorder = recorder, seed = seed
+      )
+    # A read-only view: writes through any board sharing it would fail
+    self.m_Mines = self.m_Mines.view( )
+    self.m_Mines.flags.writeable = False
+  # end def
+
+  def _new_patches( self, w, h ):
+    return PackedBits( w, h )
+  # end def
+
+  def _row_revealed( self, j, i0, i1 ):
+    return [ self.m_Patches[ i, j ] for i in range( i0, i1 ) ]
+  # end def
+
+  def storage( self ):
+    return { 'kind': 'compact' }
+  # end def
+
+  def revealed_mask( self ):
+    return self.m_Patches.to_array( )
+  # end def
+
+  def revealed_view( self ):
+    '''
+    Zero-copy, read-only view of the revealed bits ( bit k of the buffer
+    is cell ( k // height, k % height ), least significant bit first ).
+    '''
+    return memoryview( self.m_Patches.m_Bits ).toreadonly( )
+  # end def
+
+  def __getstate__( self ):
+    state = self.__dict__.copy( )
+    # Recorders hold open files: the board travels without it
+    state[ 'm_Recorder' ] = None
+    state[ 'm_Mines' ] = self.m_Mines.tobytes( )
+    state[ 'm_Patches' ] = bytes( self.m_Patches.m_Bits )
+    state[ 'shape' ] = self.m_Mines.shape
+    return state
+  # end def
+
+  def __setstate__( self, state ):
+    w, h = state.pop( 'shape' )
+    mines = numpy.frombuffer( state[ 'm_Mines' ], dtype = numpy.int8 ).reshape( w, h )
+    state[ 'm_Mines' ] = mines
+    state[ 'm_Patches' ] = PackedBits( w, h, state[ 'm_Patches' ] )
+    self.__dict__.update( state )
+  # end def
+
+# end class
+
+## eof - CompactBoard.py
@@ -0,0 +1,92 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import time
+
+import numpy
+
+from Board import Board
+from Features import feature_names, window_features
+from PlayRecorder import BinaryPlayRecorder
+
+def random_play_records( rng, count, w, h, n, size = 3, unknown_count = False ):
+  '''
+  Records of count games of a player that clicks unrevealed cells in a
+  random order ( no cascade ), as Board would record them: every cell
+  revealed up to, and including, the first mine. Returns a
+  ( rows, features + 1 ) uint8 array, games one after the other, with
+  the features of Features.window_features.
+  '''
+  layouts = Board._generate_layouts( rng, count, w, h, n ).reshape( count, w * h )
+  # Click order: the rank of every cell in its game
+  order = numpy.argsort( rng.random( ( count, w * h ), dtype = numpy.float32 ), axis = 1 )
+  ranks = numpy.empty_like( order )
+  numpy.put_along_axis( ranks, order, numpy.arange( w * h )[ None, : ], axis = 1 )
+  mines = layouts == 9
+  last = numpy.where( mines, ranks, w * h ).min( axis = 1 )
+  played = ranks <= last[ :, None ]
+
+  features = window_features(
+    layouts.reshape( count, w, h ).astype( numpy.uint8 ), size, unknown_count = unknown_count
+    ).reshape( count, w * h, -1 )
+  records = numpy.empty( ( int( played.sum( ) ), features.shape[ -1 ] + 1 ), dtype = numpy.uint8 )
+  records[ :, : -1 ] = features[ played ]
+  records[ :, -1 ] = mines[ played ]
+  return records
+# end def
+
+def generate( path, games, w, h, n, batch = 4096, seed = None, size = 3, unknown_count = False ):
+  # Independent generator per batch, so a seed gives the same file for
+  # any batch split of the same size
+  sequences = numpy.random.SeedSequence( seed ).spawn( ( games + batch - 1 ) // batch )
+  rows = 0
+  num_features = len( feature_names( size, unknown_count ) )
+  with BinaryPlayRecorder( path, num_features = num_features ) as recorder:
+    for k, sequence in enumerate( sequences ):
+      count = min( batch, games - k * batch )
+      records = random_play_records(
+        numpy.random.default_rng( sequence ), count, w, h, n, size, unknown_count
+        )
+      recorder.write_array( records )
+      rows += records.shape[ 0 ]
+    # end for
+  # end with
+  return rows
+# end def
+
+if __name__ == '__main__':
+  import argparse
+
+  parser = argparse.ArgumentParser(
+    description = 'Generate labeled neighbor records from simulated random-click games.'
+    )
+  parser.add_argument( 'output', help = 'binary record file ( see PlayRecorder.load_records )' )
+  parser.add_argument( '--games', type = int, default = 100000 )
+  parser.add_argument(
+    '--size', type = lambda s: tuple( int( v ) for v in s.split( 'x' ) ), default = ( 8, 8, 10 ),
+    help = 'WIDTHxHEIGHTxMINES'
+    )
+  parser.add_argument( '--batch', type = int, default = 4096, help = 'games simulated per NumPy batch' )
+  parser.add_argument( '--seed', type = int, default = None )
+  parser.add_argument( '--window', type = int, default = 3, help = 'odd window size ( 3: n1..n8 )' )
+  parser.add_argument(
+    '--unknown-count', action = 'store_true',
+    help = 'add the number of unknown cells ( mines, on a layout ) of the window'
+    )
+  args = parser.parse_args( )
+
+  start = time.perf_counter( )
+  w, h, n = args.size
+  rows = generate(
+    args.output, args.games, w, h, n, args.batch, args.seed, args.window, args.unknown_count
+    )
+  seconds = time.perf_counter( ) - start
+  print(
+    f'{rows} records from {args.games} games in {seconds:.2f} s'
+    f' ( {rows / seconds * 60 / 1e6:.1f} million records per minute )'
+    )
+# end if
+
+## eof - DatasetGenerator.py
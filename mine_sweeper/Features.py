@@ -0,0 +1,186 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import numpy
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Value of a cell whose number is not known ( on a layout: a mine )
+UNKNOWN = 9
+
+# Value given to window cells outside the board when recording plays ( see
+# Board ); the bot uses -1 at play time
+OFF_BOARD = 9
+
+def _check_size( size ):
+  if size < 3 or size % 2 == 0:
+    raise ValueError( f'Window size must be odd and at least 3, not {size}' )
+  # end if
+  return size // 2
+# end def
+
+def feature_names( size = 3, unknown_count = False ):
+  '''
+  Column names of the features of a size x size window: n1..n8 for the
+  default 3 x 3 window ( the columns of game_x.csv ), optionally followed
+  by the number of unknown cells in the window.
+  '''
+  _check_size( size )
+  names = [ f'n{k}' for k in range( 1, size * size ) ]
+  if unknown_count:
+    names.append( 'unknown' )
+  # end if
+  return names
+# end def
+
+def feature_names_for( num_features ):
+  # Names of a feature count: size x size - 1 window values, plus one
+  # when the unknown count is there
+  size = int( round( num_features ** 0.5 ) )
+  if size * size == num_features:
+    return feature_names( size, True )
+  # end if
+  size = int( round( ( num_features + 1 ) ** 0.5 ) )
+  if size * size == num_features + 1:
+    return feature_names( size, False )
+  # end if
+  raise ValueError( f'{num_features} features do not match a window' )
+# end def
+
+def _pad( values, r, fill ):
+  pad = [ ( 0, 0 ) ] * ( values.ndim - 2 ) + [ ( r, r ), ( r, r ) ]
+  return numpy.pad( values, pad, constant_values = fill )
+# end def
+
+def _gather( windows, index, size, counts = None ):
+  # Window values of the cells selected by index ( a tuple of index
+  # arrays, or ( Ellipsis, ) for all of them ), row major over ( dx, dy )
+  # and without the center: the n1..n8 order of the 3 x 3 window. The
+  # unknown counts, if any, are the last column.
+  selected = windows[ index ]
+  flat = selected.reshape( selected.shape[ : -2 ] + ( size * size, ) )
+  center = ( size * size ) // 2
+  parts = [ flat[ ..., : center ], flat[ ..., center + 1 : ] ]
+  if counts is not None:
+    parts.append( counts[ ..., None ].astype( flat.dtype ) )
+  # end if
+  return numpy.concatenate( parts, axis = -1 )
+# end def
+
+def _window_counts( unknown_windows, index, size ):
+  # The center is the cell itself: only the cells around it are counted
+  unknown = unknown_windows[ index ]
+  return unknown.sum( axis = ( -2, -1 ), dtype = numpy.int16 ) - unknown[ ..., size // 2, size // 2 ]
+# end def
+
+def window_features( values, size = 3, offboard = OFF_BOARD, unknown_count = False ):
+  '''
+  Features of every cell of one or more stacked ( ..., w, h ) boards:
+  the size x size window around the cell, itself excluded, with
+  offboard outside the board, as a ( ..., w, h, features ) array in the
+  order of feature_names. On a layout every safe cell is known, so its
+  unknown count is the number of mines in the window.
+  '''
+  r = _check_size( size )
+  windows = sliding_window_view( _pad( values, r, offboard ), ( size, size ), axis = ( -2, -1 ) )
+  if not unknown_count:
+    return _gather( windows, ( Ellipsis, ), size )
+  # end if
+  # Box sums over a summed-area table: O( w h ) whatever the window size
+  w, h = values.shape[ -2 : ]
+  unknown = values == UNKNOWN
+  table = numpy.zeros( values.shape[ : -2 ] + ( w + size, h + size ), dtype = numpy.int32 )
+  padded = _pad( unknown, r, False )
+  table[ ..., 1 :, 1 : ] = padded.cumsum( axis = -2, dtype = numpy.int32 ).cumsum( axis = -1 )
+  counts = (
+    table[ ..., size :, size : ] - table[ ..., : w, size : ]
+    - table[ ..., size :, : h ] + table[ ..., : w, : h ]
+    )
+  return _gather( windows, ( Ellipsis, ), size, counts - unknown )
+# end def
+
+def cell_features( values, cells_i, cells_j, size = 3, offboard = OFF_BOARD, unknown_count = False ):
+  '''
+  Features of the cells ( cells_i[ k ], cells_j[ k ] ) of a ( w, h ) board,
+  as rows of a ( cells, features ) array: only the board is padded, the
+  windows are strided views of it.
+  '''
+  r = _check_size( size )
+  windows = sliding_window_view( _pad( values, r, offboard ), ( size, size ) )
+  counts = None
+  if unknown_count:
+    unknown = sliding_window_view( _pad( values == UNKNOWN, r, False ), ( size, size ) )
+    counts = _window_counts( unknown, ( cells_i, cells_j ), size )
+  # end if
+  return _gather( windows, ( cells_i, cells_j ), size, counts )
+# end def
+
+"""
+What a player knows of a w x h board: the number of every revealed cell
+and UNKNOWN elsewhere, kept padded so that the windows of all cells are
+strided views that follow every reveal without being rebuilt.
+"""
+class Knowledge:
+
+  '''
+  '''
+  m_Size = 3
+  m_Radius = 1
+  m_Values = None
+  m_Unknown = None
+  m_Windows = None
+  m_UnknownWindows = None
+
+  def __init__( self, w, h, size = 3, offboard = -1, unknown_count = False ):
+    r = _check_size( size )
+    self.m_Size = size
+    self.m_Radius = r
+    self.m_Values = numpy.full( ( w + 2 * r, h + 2 * r ), offboard, dtype = numpy.int8 )
+    self.m_Values[ r : r + w, r : r + h ] = UNKNOWN
+    self.m_Windows = sliding_window_view( self.m_Values, ( size, size ) )
+    if unknown_count:
+      self.m_Unknown = numpy.zeros( self.m_Values.shape, dtype = bool )
+      self.m_Unknown[ r : r + w, r : r + h ] = True
+      self.m_UnknownWindows = sliding_window_view( self.m_Unknown, ( size, size ) )
+    # end if
+  # end def
+
+  def names( self ):
+    return feature_names( self.m_Size, self.m_UnknownWindows is not None )
+  # end def
+
+  def reveal( self, i, j, n ):
+    self.m_Values[ i + self.m_Radius, j + self.m_Radius ] = n
+    if self.m_Unknown is not None:
+      self.m_Unknown[ i + self.m_Radius, j + self.m_Radius ] = False
+    # end if
+  # end def
+
+  def unknown_around( self, i, j ):
+    '''
+    Unknown cells whose window holds ( i, j ): the only ones whose
+    features change when ( i, j ) is revealed. Returns two index arrays.
+    '''
+    r = self.m_Radius
+    w, h = self.m_Windows.shape[ : 2 ]
+    i0, j0 = max( i - r, 0 ), max( j - r, 0 )
+    block = self.m_Values[ i0 + r : min( i + r + 1, w ) + r, j0 + r : min( j + r + 1, h ) + r ]
+    di, dj = numpy.nonzero( block == UNKNOWN )
+    return di + i0, dj + j0
+  # end def
+
+  def features( self, cells_i = None, cells_j = None ):
+    # ( cells, features ) rows of the given cells, or ( w, h, features )
+    # for the whole board
+    index = ( Ellipsis, ) if cells_i is None else ( cells_i, cells_j )
+    counts = None
+    if self.m_UnknownWindows is not None:
+      counts = _window_counts( self.m_UnknownWindows, index, self.m_Size )
+    # end if
+    return _gather( self.m_Windows, index, self.m_Size, counts )
+  # end def
+
+# end class
+
+## eof - Features.py
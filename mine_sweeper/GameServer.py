@@ -0,0 +1,403 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import asyncio
+import json
+import random
+import sys
+import time
+
+from Board import Board
+from Instrumentation import Instrumentation
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_SESSIONS = 100000
+
+"""
+Hosts many Board sessions in one process. Requests and responses are JSON
+objects, one per line:
+
+  { "op": "new", "width": 8, "height": 8, "mines": 10 [, "seed": s ] [, "cascade": true ] }
+    -> { "ok": true, "game": g, "seed": s }
+  { "op": "click", "game": g, "i": i, "j": j }
+    -> { "ok": true, "revealed": [ [ i, j, value ], ... ], "finished": f, "won": w }
+  { "op": "state", "game": g }
+    -> { "ok": true, "revealed": [ [ i, j, value ], ... ], "plays": p, "finished": f, "won": w }
+  { "op": "result", "game": g }
+    -> { "ok": true, "result": "won" | "lost" | "playing", "plays": p } ( ends the session )
+  { "op": "close", "game": g }
+    -> { "ok": true } ( abandons the session )
+
+Sessions belong to the connection that opened them: those still open when
+it disconnects are dropped.
+
+An optional "id" in a request is echoed in its response; failures answer
+{ "ok": false, "error": message }.
+"""
+class GameServer:
+
+  '''
+  '''
+  m_Sessions    = None
+  m_NextGame    = 0
+  m_MaxSessions = MAX_SESSIONS
+  m_BoardClass  = Board
+
+  def __init__( self, max_sessions = MAX_SESSIONS, board_class = Board ):
+    # board_class = CompactBoard packs the revealed state of every session
+    self.m_Sessions = { }
+    self.m_NextGame = 0
+    self.m_MaxSessions = max_sessions
+    self.m_BoardClass = board_class
+  # end def
+
+  def handle( self, request, owned = None ):
+    # Board operations are short and CPU bound: they run inline in the
+    # event loop, without locks. owned, if given, is the set of games
+    # opened by the connection
+    try:
+      op = request.get( 'op' )
+      if op == 'new':
+        response = self._new( request )
+        if owned is not None:
+          owned.add( response[ 'game' ] )
+        # end if
+      elif op in ( 'click', 'state', 'result', 'close' ):
+        game = request.get( 'game' )
+        if game not in self.m_Sessions:
+          raise ValueError( f'Unknown game {game}' )
+        # end if
+        response = getattr( self, '_' + op )( game, request )
+        if op in ( 'result', 'close' ) and owned is not None:
+          owned.discard( game )
+        # end if
+      else:
+        raise ValueError( f'Unknown op {op}' )
+      # end if
+    except ( KeyError, TypeError, ValueError ) as error:
+      response = { 'ok': False, 'error': str( error ) }
+    # end try
+    if 'id' in request:
+      response[ 'id' ] = request[ 'id' ]
+    # end if
+    return response
+  # end def
+
+  def _new( self, request ):
+    if len( self.m_Sessions ) >= self.m_MaxSessions:
+      raise ValueError( 'Too many open games' )
+    # end if
+    w, h, n = int( request[ 'width' ] ), int( request[ 'height' ] ), int( request[ 'mines' ] )
+    if w <= 0 or h <= 0 or n < 0 or n >= w * h:
+      raise ValueError( f'Invalid board {w}x{h} with {n} mines' )
+    # end if
+    seed = request.get( 'seed' )
+    if seed is None:
+      seed = random.getrandbits( 32 )
+    # end if
+    board = self.m_BoardClass( w, h, n, record_play_data = False, seed = int( seed ) )
+    game = self.m_NextGame
+    self.m_NextGame += 1
+    self.m_Sessions[ game ] = ( board, bool( request.get( 'cascade', False ) ) )
+    return { 'ok': True, 'game': game, 'seed': seed }
+  # end def
+
+  def _click( self, game, request ):
+    board, cascade = self.m_Sessions[ game ]
+    i, j = int( request[ 'i' ] ), int( request[ 'j' ] )
+    if not ( 0 <= i < board.width( ) and 0 <= j < board.height( ) ):
+      raise ValueError( f'Cell ( {i}, {j} ) is outside the {board.width( )}x{board.height( )} board' )
+    # end if
+    if cascade:
+      revealed = [ list( c ) for c in board.click( i, j, cascade = True ) ]
+    else:
+      revealed = [ [ i, j, board.click( i, j ) ] ]
+    # end if
+    return {
+      'ok': True, 'revealed': revealed,
+      'finished': board.have_finished( ), 'won': board.have_won( )
+      }
+  # end def
+
+  def _state( self, game, request ):
+    board, _ = self.m_Sessions[ game ]
+    cells = board.revealed_mask( ).nonzero( )
+    values = board.m_Mines[ cells ].tolist( )
+    revealed = [ [ i, j, v ] for i, j, v in zip( cells[ 0 ].tolist( ), cells[ 1 ].tolist( ), values ) ]
+    return {
+      'ok': True, 'revealed': revealed, 'plays': board.play_count( ),
+      'finished': board.have_finished( ), 'won': board.have_won( )
+      }
+  # end def
+
+  def _result( self, game, request ):
+    board, _ = self.m_Sessions.pop( game )
+    if board.have_won( ):
+      result = 'won'
+    elif board.have_lose( ):
+      result = 'lost'
+    else:
+      result = 'playing'
+    # end if
+    return { 'ok': True, 'result': result, 'plays': board.play_count( ) }
+  # end def
+
+  def _close( self, game, request ):
+    del self.m_Sessions[ game ]
+    return { 'ok': True }
+  # end def
+
+  def release( self, owned ):
+    # Drops the games a finished connection left open
+    for game in owned:
+      self.m_Sessions.pop( game, None )
+    # end for
+    owned.clear( )
+  # end def
+
+  def answer( self, line, owned = None ):
+    # One request line to one response line
+    try:
+      request = json.loads( line )
+      if not isinstance( request, dict ):
+        raise ValueError( 'Requests must be JSON objects' )
+      # end if
+      response = self.handle( request, owned )
+    except ValueError as error:
+      response = { 'ok': False, 'error': str( error ) }
+    # end try
+    return json.dumps( response, separators = ( ',', ':' ) ).encode( ) + b'\n'
+  # end def
+
+  async def serve_stream( self, reader, writer ):
+    # One connection: answers every request line in order
+    owned = set( )
+    try:
+      while True:
+        line = await reader.readline( )
+        if not line:
+          break
+        # end if
+        if line.strip( ):
+          writer.write( self.answer( line, owned ) )
+          await writer.drain( )
+        # end if
+      # end while
+    except ConnectionError:
+      pass
+    finally:
+      self.release( owned )
+      writer.close( )
+    # end try
+  # end def
+
+  async def serve_socket( self, host = DEFAULT_HOST, port = DEFAULT_PORT ):
+    return await asyncio.start_server( self.serve_stream, host, port, limit = 1 << 20 )
+  # end def
+
+  async def serve_stdio( self ):
+    # stdin / stdout may be files or terminals, not only pipes: lines are
+    # read in a thread and answers written directly
+    loop = asyncio.get_running_loop( )
+    owned = set( )
+    try:
+      while True:
+        line = await loop.run_in_executor( None, sys.stdin.buffer.readline )
+        if not line:
+          break
+        # end if
+        if line.strip( ):
+          sys.stdout.buffer.write( self.answer( line, owned ) )
+          sys.stdout.buffer.flush( )
+        # end if
+      # end while
+    finally:
+      self.release( owned )
+    # end try
+  # end def
+
+# end class
+
+"""
+Load generator: concurrent connections each play whole games ( random
+unrevealed cells ) until the requested number of sessions is done, timing
+every request.
+"""
+class LoadClient:
+
+  '''
+  '''
+  m_Host        = DEFAULT_HOST
+  m_Port        = DEFAULT_PORT
+  m_Size        = ( 8, 8, 10 )
+  m_Cascade     = False
+  m_Remaining   = 0
+  m_Profile     = None
+  m_Random      = None
+  m_Sessions    = 0
+
+  def __init__( self, host, port, size, cascade = False, seed = None ):
+    self.m_Host = host
+    self.m_Port = port
+    self.m_Size = size
+    self.m_Cascade = cascade
+    self.m_Profile = Instrumentation( )
+    self.m_Random = random.Random( seed )
+    self.m_Sessions = 0
+  # end def
+
+  async def run( self, sessions, connections ):
+    self.m_Remaining = sessions
+    start = time.perf_counter( )
+    await asyncio.gather( *[ self._connection( ) for k in range( connections ) ] )
+    return time.perf_counter( ) - start
+  # end def
+
+  async def _connection( self ):
+    reader, writer = await asyncio.open_connection( self.m_Host, self.m_Port, limit = 1 << 20 )
+    try:
+      while self.m_Remaining > 0:
+        self.m_Remaining -= 1
+        await self._play( reader, writer )
+        self.m_Sessions += 1
+      # end while
+    finally:
+      writer.close( )
+    # end try
+  # end def
+
+  async def _request( self, reader, writer, request ):
+    start = time.perf_counter( )
+    writer.write( json.dumps( request, separators = ( ',', ':' ) ).encode( ) + b'\n' )
+    response = json.loads( await reader.readline( ) )
+    self.m_Profile.add( request[ 'op' ], time.perf_counter( ) - start )
+    if not response[ 'ok' ]:
+      raise RuntimeError( response[ 'error' ] )
+    # end if
+    return response
+  # end def
+
+  async def _play( self, reader, writer ):
+    w, h, n = self.m_Size
+    new = await self._request(
+      reader, writer,
+      { 'op': 'new', 'width': w, 'height': h, 'mines': n,
+        'seed': self.m_Random.getrandbits( 32 ), 'cascade': self.m_Cascade }
+      )
+    game = new[ 'game' ]
+    # Unknown cells with O(1) removal: swap with the last one
+    unknown = [ ( i, j ) for i in range( w ) for j in range( h ) ]
+    position = { c: k for k, c in enumerate( unknown ) }
+    finished = False
+    while not finished and len( unknown ) > 0:
+      i, j = unknown[ self.m_Random.randrange( len( unknown ) ) ]
+      response = await self._request( reader, writer, { 'op': 'click', 'game': game, 'i': i, 'j': j } )
+      for ( x, y, v ) in response[ 'revealed' ]:
+        k = position.pop( ( x, y ), None )
+        if k is not None:
+          last = unknown.pop( )
+          if k < len( unknown ):
+            unknown[ k ] = last
+            position[ last ] = k
+          # end if
+        # end if
+      # end for
+      finished = response[ 'finished' ]
+    # end while
+    await self._request( reader, writer, { 'op': 'result', 'game': game } )
+  # end def
+
+# end class
+
+def board_class( args ):
+  if args.compact:
+    from CompactBoard import CompactBoard
+    return CompactBoard
+  # end if
+  return Board
+# end def
+
+async def run_load( args ):
+  server = None
+  host, port = args.host, args.port
+  if not args.external:
+    # Server and clients share this event loop, on an ephemeral port
+    server = await GameServer( board_class = board_class( args ) ).serve_socket( host, 0 )
+    port = server.sockets[ 0 ].getsockname( )[ 1 ]
+  # end if
+  client = LoadClient( host, port, args.size, args.cascade, args.seed )
+  seconds = await client.run( args.sessions, args.connections )
+  if server is not None:
+    server.close( )
+    await server.wait_closed( )
+  # end if
+
+  requests = sum( h.m_Count for h in client.m_Profile.m_Histograms.values( ) )
+  print(
+    f'{client.m_Sessions} sessions over {args.connections} connections in {seconds:.2f} s:'
+    f' {client.m_Sessions / seconds:.1f} sessions/s, {requests / seconds:.1f} requests/s'
+    )
+  print( f"{'op':>8} {'count':>9} {'mean_us':>9} {'p50_us':>9} {'p95_us':>9} {'p99_us':>9} {'max_us':>9}" )
+  for row in client.m_Profile.summary( ):
+    print(
+      f"{row[ 'call' ]:>8} {row[ 'count' ]:>9} {row[ 'mean_us' ]:>9.1f} {row[ 'p50_us' ]:>9.1f}"
+      f" {row[ 'p95_us' ]:>9.1f} {row[ 'p99_us' ]:>9.1f} {row[ 'max_us' ]:>9.1f}"
+      )
+  # end for
+# end def
+
+async def run_server( args ):
+  server = GameServer( args.max_sessions, board_class( args ) )
+  if args.stdio:
+    await server.serve_stdio( )
+  else:
+    socket_server = await server.serve_socket( args.host, args.port )
+    print( f'Serving MineSweeper games on {args.host}:{args.port}', file = sys.stderr )
+    async with socket_server:
+      await socket_server.serve_forever( )
+    # end with
+  # end if
+# end def
+
+if __name__ == '__main__':
+  import argparse
+
+  parser = argparse.ArgumentParser( description = 'Line-delimited JSON MineSweeper game server.' )
+  commands = parser.add_subparsers( dest = 'command', required = True )
+
+  serve = commands.add_parser( 'serve', help = 'host games on a local socket or on stdio' )
+  serve.add_argument( '--host', default = DEFAULT_HOST )
+  serve.add_argument( '--port', type = int, default = DEFAULT_PORT )
+  serve.add_argument( '--stdio', action = 'store_true', help = 'one client on stdin / stdout' )
+  serve.add_argument( '--max-sessions', type = int, default = MAX_SESSIONS )
+  serve.add_argument( '--compact', action = 'store_true', help = 'bit-packed board state per session' )
+
+  load = commands.add_parser( 'load', help = 'measure sessions/s and request latency' )
+  load.add_argument( '--host', default = DEFAULT_HOST )
+  load.add_argument( '--port', type = int, default = DEFAULT_PORT )
+  load.add_argument(
+    '--external', action = 'store_true',
+    help = 'use a server already running on --host / --port instead of an in-process one'
+    )
+  load.add_argument( '--sessions', type = int, default = 10000 )
+  load.add_argument( '--connections', type = int, default = 100 )
+  load.add_argument(
+    '--size', type = lambda s: tuple( int( v ) for v in s.split( 'x' ) ), default = ( 8, 8, 10 ),
+    help = 'WIDTHxHEIGHTxMINES'
+    )
+  load.add_argument( '--cascade', action = 'store_true' )
+  load.add_argument( '--compact', action = 'store_true', help = 'bit-packed board state in the in-process server' )
+  load.add_argument( '--seed', type = int, default = None )
+  args = parser.parse_args( )
+
+  try:
+    asyncio.run( run_server( args ) if args.command == 'serve' else run_load( args ) )
+  except KeyboardInterrupt:
+    pass
+  # end try
+# end if
+
+## eof - GameServer.py
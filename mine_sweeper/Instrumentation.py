@@ -0,0 +1,146 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import math
+import time
+
+"""
+Latency histogram with logarithmic buckets ( about 4% wide ): adding a
+sample is O(1), memory does not grow with the number of samples and
+histograms from different games or workers merge by adding buckets.
+"""
+class LatencyHistogram:
+
+  '''
+  '''
+  BUCKETS_PER_E = 1.0 / math.log( 1.04 )
+
+  m_Buckets = None
+  m_Count   = 0
+  m_Total   = 0.0
+  m_Max     = 0.0
+
+  def __init__( self ):
+    self.m_Buckets = { }
+    self.m_Count = 0
+    self.m_Total = 0.0
+    self.m_Max = 0.0
+  # end def
+
+  def add( self, seconds ):
+    ns = max( seconds * 1e9, 1.0 )
+    b = int( math.log( ns ) * self.BUCKETS_PER_E )
+    self.m_Buckets[ b ] = self.m_Buckets.get( b, 0 ) + 1
+    self.m_Count += 1
+    self.m_Total += seconds
+    if seconds > self.m_Max:
+      self.m_Max = seconds
+    # end if
+  # end def
+
+  def merge( self, other ):
+    for b, c in other.m_Buckets.items( ):
+      self.m_Buckets[ b ] = self.m_Buckets.get( b, 0 ) + c
+    # end for
+    self.m_Count += other.m_Count
+    self.m_Total += other.m_Total
+    self.m_Max = max( self.m_Max, other.m_Max )
+  # end def
+
+  def mean( self ):
+    return self.m_Total / self.m_Count if self.m_Count > 0 else 0.0
+  # end def
+
+  def percentile( self, q ):
+    # Geometric center of the bucket holding the q-th sample, in seconds
+    if self.m_Count == 0:
+      return 0.0
+    # end if
+    rank = q / 100.0 * self.m_Count
+    seen = 0
+    for b in sorted( self.m_Buckets ):
+      seen += self.m_Buckets[ b ]
+      if seen >= rank:
+        return min( math.exp( ( b + 0.5 ) / self.BUCKETS_PER_E ) * 1e-9, self.m_Max )
+      # end if
+    # end for
+    return self.m_Max
+  # end def
+
+# end class
+
+"""
+Optional timing hooks: wrap replaces a method of one object with a timed
+version, so uninstrumented games pay nothing.
+"""
+class Instrumentation:
+
+  '''
+  '''
+  m_Histograms = None
+
+  def __init__( self ):
+    self.m_Histograms = { }
+  # end def
+
+  def histogram( self, label ):
+    if label not in self.m_Histograms:
+      self.m_Histograms[ label ] = LatencyHistogram( )
+    # end if
+    return self.m_Histograms[ label ]
+  # end def
+
+  def add( self, label, seconds ):
+    self.histogram( label ).add( seconds )
+  # end def
+
+  def wrap( self, obj, method_name, label ):
+    method = getattr( obj, method_name )
+    histogram = self.histogram( label )
+    clock = time.perf_counter
+
+    def timed( *args, **kwargs ):
+      start = clock( )
+      try:
+        return method( *args, **kwargs )
+      finally:
+        histogram.add( clock( ) - start )
+      # end try
+    # end def
+
+    setattr( obj, method_name, timed )
+  # end def
+
+  def merge( self, other ):
+    for label, histogram in other.m_Histograms.items( ):
+      self.histogram( label ).merge( histogram )
+    # end for
+  # end def
+
+  def summary( self ):
+    # One row per instrumented call: count, total seconds and latencies
+    # in microseconds
+    rows = [ ]
+    for label in sorted( self.m_Histograms ):
+      h = self.m_Histograms[ label ]
+      rows.append(
+        {
+          'call': label,
+          'count': h.m_Count,
+          'total_s': h.m_Total,
+          'mean_us': h.mean( ) * 1e6,
+          'p50_us': h.percentile( 50 ) * 1e6,
+          'p95_us': h.percentile( 95 ) * 1e6,
+          'p99_us': h.percentile( 99 ) * 1e6,
+          'max_us': h.m_Max * 1e6
+          }
+        )
+    # end for
+    return rows
+  # end def
+
+# end class
+
+## eof - Instrumentation.py
@@ -4,7 +4,10 @@
 ## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
 ## @author Katheryn Sofia Guasca Chavarro (katheryn.guascar@javeriana.edu.co)
 ## =========================================================================
-import importlib.util, sys
+import time
+_START = time.perf_counter( )
+
+import contextlib, importlib.util, json, os, random, sys
 from Board import *
 
 '''
@@ -27,13 +30,84 @@ def ImportLibrary( module_name, filename ):
   return None
 # end def
 
+'''
+Removes a flag from the player arguments, telling whether it was there
+'''
+def PopFlag( args, flag ):
+  return ( flag in args, [ arg for arg in args if arg != flag ] )
+# end def
+
+'''
+Removes an option and its value from the player arguments
+'''
+def PopOption( args, option ):
+  value = None
+  rest = [ ]
+  k = 0
+  while k < len( args ):
+    if args[ k ] == option and k + 1 < len( args ):
+      value = args[ k + 1 ]
+      k += 2
+    else:
+      rest.append( args[ k ] )
+      k += 1
+    # end if
+  # end while
+  return ( value, rest )
+# end def
+
+'''
+Integer value of a seed option, leaving with a usage message if it is
+missing or not an integer
+'''
+def ParseSeed( args, option ):
+  k = args.index( option )
+  try:
+    return int( args[ k + 1 ] )
+  except ( IndexError, ValueError ):
+    print( f'Usage: {option} N, where N is an integer seed', file = sys.stderr )
+    sys.exit( 1 )
+  # end try
+# end def
+
+'''
+Prints the time spent in each startup phase, in the spirit of -X importtime
+'''
+def PrintStartupReport( phases, new_modules ):
+  print( 'startup: self [us] | cumulative [us] | phase', file = sys.stderr )
+  previous = _START
+  for name, stamp in phases:
+    print(
+      f'startup: {int( ( stamp - previous ) * 1e6 ):>9} | '
+      f'{int( ( stamp - _START ) * 1e6 ):>15} | {name}',
+      file = sys.stderr
+      )
+    previous = stamp
+  # end for
+  packages = sorted( { m.split( '.' )[ 0 ] for m in new_modules } )
+  print( 'startup: modules loaded while starting the game:', ' '.join( packages ), file = sys.stderr )
+# end def
+
+'''
+The whole board, or the viewport ( width, height ) centered on the last click
+'''
+def Render( board, viewport, clicks ):
+  if viewport is None:
+    return board.render( )
+  # end if
+  i, j = clicks[ -1 ] if len( clicks ) > 0 else ( 0, 0 )
+  return board.render( i - viewport[ 0 ] // 2, j - viewport[ 1 ] // 2, viewport[ 0 ], viewport[ 1 ] )
+# end def
+
 """
 """
 if __name__ == '__main__':
 
   if len( sys.argv ) < 5:
     print(
-      "Usage: python3", sys.argv[ 0 ], "width height mines player [--record-data] <player arguments>"
+      "Usage: python3", sys.argv[ 0 ],
+      "width height mines player [--record-data] [--cascade] [--headless] [--startup-report] [--sparse] [--compact]",
+      "[--board-seed N] [--replay-log PATH] [--viewport WxH] [--seed N] <player arguments>"
       )
     sys.exit( 1 )
   # end if
@@ -43,30 +117,122 @@ if __name__ == '__main__':
   player_fname = sys.argv[ 4 ]
   player_args = sys.argv[ 5 : ]
 
-  record_play_data = False
-  if '--record-data' in player_args:
-    record_play_data = True
-    player_args = [ arg for arg in player_args if arg != '--record-data' ]
+  record_play_data, player_args = PopFlag( player_args, '--record-data' )
+  cascade, player_args = PopFlag( player_args, '--cascade' )
+  # Headless: no rendering, player output silenced, one JSON result line
+  headless, player_args = PopFlag( player_args, '--headless' )
+  startup_report, player_args = PopFlag( player_args, '--startup-report' )
+  # Chunked board for very large grids ( see SparseBoard.py )
+  sparse, player_args = PopFlag( player_args, '--sparse' )
+  # Bit-packed revealed state ( see CompactBoard.py )
+  compact, player_args = PopFlag( player_args, '--compact' )
+  board_seed = None
+  if '--board-seed' in player_args:
+    board_seed = ParseSeed( player_args, '--board-seed' )
+  # end if
+  _, player_args = PopOption( player_args, '--board-seed' )
+  replay_log, player_args = PopOption( player_args, '--replay-log' )
+  # --viewport WxH draws only a window around the last click
+  viewport, player_args = PopOption( player_args, '--viewport' )
+  if viewport is not None:
+    viewport = tuple( int( v ) for v in viewport.split( 'x' ) )
+  # end if
+  if board_seed is None and replay_log is not None:
+    # A logged game needs a known seed to be replayed
+    board_seed = random.getrandbits( 32 )
   # end if
+  player_seed = None
+  if '--seed' in player_args:
+    player_seed = ParseSeed( player_args, '--seed' )
+  elif replay_log is not None:
+    player_seed = random.getrandbits( 32 )
+    player_args = player_args + [ '--seed', str( player_seed ) ]
+  # end if
+  phases = [ ( 'import Board', time.perf_counter( ) ) ]
 
-  # Load player
-  player_lib = ImportLibrary( 'Player', player_fname )
-  player = player_lib.Player( player_args )
+  with contextlib.ExitStack( ) as player_output:
+    if headless:
+      devnull = player_output.enter_context( open( os.devnull, 'w' ) )
+      player_output.enter_context( contextlib.redirect_stdout( devnull ) )
+    # end if
 
-  # Create board
-  board = Board( w, h, m, record_play_data = record_play_data )
+    # Load player
+    modules_before = set( sys.modules )
+    player_lib = ImportLibrary( 'Player', player_fname )
+    phases.append( ( 'import player module', time.perf_counter( ) ) )
+    player = player_lib.Player( player_args )
+    phases.append( ( 'create player', time.perf_counter( ) ) )
 
-  # Play!
-  while not board.have_finished( ):
-    print( board )
-    i, j = player.choose_cell( w, h, m )
-    print( 'Cell =', i, j )
-    n = board.click( i, j )
-    player.report( i, j, n )
-  # end while
+    # Create board
+    if sparse:
+      from SparseBoard import SparseBoard
+      board = SparseBoard( w, h, m, record_play_data = record_play_data, seed = board_seed )
+    elif compact:
+      from CompactBoard import CompactBoard
+      board = CompactBoard( w, h, m, record_play_data = record_play_data, seed = board_seed )
+    else:
+      board = Board( w, h, m, record_play_data = record_play_data, seed = board_seed )
+    # end if
+    phases.append( ( 'create board', time.perf_counter( ) ) )
+    if startup_report:
+      PrintStartupReport( phases, set( sys.modules ) - modules_before )
+    # end if
+
+    # Play!
+    clicks = [ ]
+    while not board.have_finished( ):
+      if not headless:
+        print( Render( board, viewport, clicks ) )
+      # end if
+      i, j = player.choose_cell( w, h, m )
+      clicks.append( ( i, j ) )
+      if not headless:
+        print( 'Cell =', i, j )
+      # end if
+      if cascade:
+        # Zero regions are revealed by the board in a single click
+        for ( x, y, n ) in board.click( i, j, cascade = True ):
+          player.report( x, y, n )
+        # end for
+      else:
+        n = board.click( i, j )
+        player.report( i, j, n )
+      # end if
+    # end while
+  # end with
+
+  if replay_log is not None:
+    from Replay import ReplayLog, make_record
+    logged_args = list( player_args )
+    if '--seed' in logged_args:
+      k = logged_args.index( '--seed' )
+      del logged_args[ k : k + 2 ]
+    # end if
+    with ReplayLog( replay_log ) as log:
+      log.write( make_record( board, board_seed, player_fname, logged_args, player_seed, cascade, clicks ) )
+    # end with
+  # end if
+
+  if headless:
+    print(
+      json.dumps(
+        {
+          'result': 'won' if board.have_won( ) else 'lost',
+          'plays': board.play_count( ),
+          'width': w,
+          'height': h,
+          'mines': m,
+          'accuracy': getattr( player, 'm_ModelAccuracy', None ),
+          'precision': getattr( player, 'm_ModelPrecision', None ),
+          'seconds': time.perf_counter( ) - _START
+          }
+        )
+      )
+    sys.exit( 0 )
+  # end if
 
   print( '====================================================' )
-  print( board )
+  print( Render( board, viewport, clicks ) )
   if board.have_won( ):
     print( "You won!" )
   elif board.have_lose( ):
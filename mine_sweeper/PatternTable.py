@@ -0,0 +1,165 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import struct
+
+import numpy
+
+from PlayRecorder import FEATURE_NAMES
+from Training import ALPHABET, DEFAULT_STATE_PATH, VALUE_OFFSET, PatternCounts, encode_patterns
+
+# Header: magic, number of features and the value used for off-board
+# neighbors by the data the table was built from ( -1 for the bot's own
+# encoding, 9 for the recorded games ), followed by one uint16 per pattern
+TABLE_MAGIC = b'MSPTABL1'
+TABLE_HEADER = struct.Struct( '<8sIb3x' )
+
+# 0 marks an unseen pattern, 1..65535 a quantized probability
+UNSEEN = 0
+LEVELS = 65534
+
+def _quantize( probabilities ):
+  return ( numpy.rint( numpy.clip( probabilities, 0.0, 1.0 ) * LEVELS ) + 1 ).astype( numpy.uint16 )
+# end def
+
+def _create( path, num_features, offboard ):
+  # Zero filled ( every pattern unseen ), sparse on most file systems
+  with open( path, 'wb' ) as f:
+    f.write( TABLE_HEADER.pack( TABLE_MAGIC, num_features, offboard ) )
+    f.truncate( TABLE_HEADER.size + 2 * ALPHABET ** num_features )
+  # end with
+  return numpy.memmap(
+    path, dtype = numpy.uint16, mode = 'r+',
+    offset = TABLE_HEADER.size, shape = ( ALPHABET ** num_features, )
+    )
+# end def
+
+def compile_model( path, coef, intercept, block_rows = 64 ):
+  '''
+  Tabulates the logistic model for every pattern. The linear score splits
+  into a low and a high half-table ( 11^4 entries each ), so each block is
+  one broadcast sum.
+  '''
+  coef = numpy.asarray( coef, dtype = float )
+  num_features = coef.shape[ 0 ]
+  half = num_features // 2
+  low = _half_scores( coef[ : half ] )
+  high = _half_scores( coef[ half : ] ) + intercept
+  table = _create( path, num_features, -1 )
+  view = table.reshape( high.shape[ 0 ], low.shape[ 0 ] )
+  for start in range( 0, high.shape[ 0 ], block_rows ):
+    z = high[ start : start + block_rows, None ] + low[ None, : ]
+    view[ start : start + block_rows ] = _quantize( 0.5 * ( 1.0 + numpy.tanh( 0.5 * z ) ) )
+  # end for
+  table.flush( )
+# end def
+
+def _half_scores( coef ):
+  # Linear score of every base-11 code over len( coef ) features
+  codes = numpy.arange( ALPHABET ** coef.shape[ 0 ], dtype = numpy.int64 )
+  scores = numpy.zeros( codes.shape[ 0 ] )
+  for k in range( coef.shape[ 0 ] ):
+    scores += ( ( codes // ALPHABET ** k ) % ALPHABET - VALUE_OFFSET ) * coef[ k ]
+  # end for
+  return scores
+# end def
+
+def compile_counts( path, counts, min_count = 5, offboard = 9 ):
+  '''
+  Empirical mine frequency of every recorded pattern seen at least
+  min_count times ( smoothed towards 1/2 ); the rest stay unseen.
+  '''
+  total = counts.m_Negatives + counts.m_Positives
+  keep = total >= min_count
+  table = _create( path, len( FEATURE_NAMES ), offboard )
+  table[ counts.m_Codes[ keep ] ] = _quantize(
+    ( counts.m_Positives[ keep ] + 0.5 ) / ( total[ keep ] + 1.0 )
+    )
+  table.flush( )
+# end def
+
+"""
+Read-only, memory-mapped pattern table: the mine probability of a
+neighborhood is one array index.
+"""
+class PatternTable:
+
+  '''
+  '''
+  m_Table    = None
+  m_Offboard = -1
+
+  def __init__( self, path ):
+    with open( path, 'rb' ) as f:
+      magic, num_features, offboard = TABLE_HEADER.unpack( f.read( TABLE_HEADER.size ) )
+    # end with
+    if magic != TABLE_MAGIC:
+      raise ValueError( f'{path} is not a pattern table' )
+    # end if
+    self.m_Offboard = offboard
+    self.m_Table = numpy.memmap(
+      path, dtype = numpy.uint16, mode = 'r',
+      offset = TABLE_HEADER.size, shape = ( ALPHABET ** num_features, )
+      )
+  # end def
+
+  def lookup( self, features ):
+    '''
+    Mine probabilities for a ( cells, features ) matrix in the bot's
+    encoding ( -1 off board ); NaN for unseen patterns.
+    '''
+    features = numpy.asarray( features, dtype = numpy.int64 )
+    if self.m_Offboard != -1:
+      features = numpy.where( features == -1, self.m_Offboard, features )
+    # end if
+    q = self.m_Table[ encode_patterns( features ) ].astype( float )
+    q[ q == UNSEEN ] = numpy.nan
+    return ( q - 1.0 ) / LEVELS
+  # end def
+
+# end class
+
+if __name__ == '__main__':
+  import argparse
+  import time
+
+  from Training import check_record_file, refresh_model
+
+  parser = argparse.ArgumentParser(
+    description = 'Compile the LogisticRegressionBot model or the recorded mine frequencies into a lookup table.'
+    )
+  parser.add_argument( 'table' )
+  parser.add_argument(
+    '--source', choices = ( 'model', 'counts' ), default = 'model',
+    help = 'fitted logistic model or empirical frequencies of the recorded patterns'
+    )
+  parser.add_argument( '--min-count', type = int, default = 5 )
+  parser.add_argument( '--records', default = None, help = 'binary record file instead of the CSVs' )
+  parser.add_argument( '--state', default = DEFAULT_STATE_PATH )
+  args = parser.parse_args( )
+  if args.records is not None:
+    try:
+      check_record_file( args.records )
+    except ValueError as error:
+      parser.error( str( error ) )
+    # end try
+  # end if
+
+  start = time.perf_counter( )
+  # Both sources come from the incremental training state, refreshed first
+  model, stats = refresh_model( records_path = args.records, state_path = args.state )
+  if args.source == 'model':
+    compile_model( args.table, model[ 'coef' ], model[ 'intercept' ] )
+  else:
+    counts, _ = PatternCounts.load( args.state )
+    compile_counts( args.table, counts, args.min_count )
+  # end if
+  print(
+    f"{args.table}: {args.source} table from {stats[ 'rows' ]} rows"
+    f" ( {stats[ 'patterns' ]} patterns ), {time.perf_counter( ) - start:.2f} s"
+    )
+# end if
+
+## eof - PatternTable.py
@@ -0,0 +1,270 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import abc
+import csv
+import os
+import struct
+
+import numpy
+
+BASE_DIR = os.path.dirname( os.path.abspath( __file__ ) )
+DEFAULT_X_PATH = os.path.join( BASE_DIR, 'game_x.csv' )
+DEFAULT_Y_PATH = os.path.join( BASE_DIR, 'game_y.csv' )
+FEATURE_NAMES = [ f'n{i}' for i in range( 1, 9 ) ]
+LABEL_NAME = 'mina_encontrada'
+
+# Binary files: a 16 byte header ( magic, number of features ) followed by
+# fixed-width uint8 records, each one the features plus the label
+BINARY_MAGIC = b'MSPLAYS1'
+BINARY_HEADER = struct.Struct( '<8sI4x' )
+
+"""
+"""
+class PlayRecorder( abc.ABC ):
+
+  '''
+  Buffers play records ( feature values followed by the mine label ) and
+  hands them to _write_rows in bulk. Writers implement _write_rows; see
+  MemoryPlayRecorder for one that only collects the records.
+  '''
+  m_Buffer     = None
+  m_BufferRows = None
+
+  def __init__( self, buffer_rows = None ):
+    self.m_Buffer = [ ]
+    self.m_BufferRows = buffer_rows
+  # end def
+
+  def __enter__( self ):
+    return self
+  # end def
+
+  def __exit__( self, exc_type, exc_value, traceback ):
+    self.close( )
+  # end def
+
+  def write( self, records ):
+    self.m_Buffer.extend( records )
+    if self.m_BufferRows is not None and len( self.m_Buffer ) >= self.m_BufferRows:
+      self.flush( )
+    # end if
+  # end def
+
+  def flush( self ):
+    if len( self.m_Buffer ) > 0:
+      records = self.m_Buffer
+      self.m_Buffer = [ ]
+      self._write_rows( records )
+    # end if
+  # end def
+
+  def close( self ):
+    self.flush( )
+  # end def
+
+  @abc.abstractmethod
+  def _write_rows( self, records ):
+    pass
+  # end def
+
+# end class
+
+"""
+"""
+class MemoryPlayRecorder( PlayRecorder ):
+
+  '''
+  Keeps every record in memory, so they can be shipped to a single writer
+  ( see take ): flushing and closing keep the records.
+  '''
+  m_Records = None
+
+  def __init__( self, buffer_rows = None ):
+    super( ).__init__( buffer_rows )
+    self.m_Records = [ ]
+  # end def
+
+  def _write_rows( self, records ):
+    self.m_Records.extend( records )
+  # end def
+
+  def take( self ):
+    # Every record written so far, flushed or not
+    self.flush( )
+    records = self.m_Records
+    self.m_Records = [ ]
+    return records
+  # end def
+
+# end class
+
+"""
+"""
+class CsvPlayRecorder( PlayRecorder ):
+
+  '''
+  Writes features and labels to the game_x.csv / game_y.csv pair. Both
+  files are written in the same flush, so their rows stay aligned.
+  '''
+  m_PathX = None
+  m_PathY = None
+  m_FileX = None
+  m_FileY = None
+  m_FeatureNames = FEATURE_NAMES
+
+  def __init__(
+    self, path_x = DEFAULT_X_PATH, path_y = DEFAULT_Y_PATH, buffer_rows = 65536,
+    feature_names = FEATURE_NAMES
+    ):
+    super( ).__init__( buffer_rows )
+    self.m_PathX = path_x
+    self.m_PathY = path_y
+    self.m_FeatureNames = feature_names
+  # end def
+
+  def _open( self ):
+    self.m_FileX = open( self.m_PathX, 'a', newline = '' )
+    self.m_FileY = open( self.m_PathY, 'a', newline = '' )
+
+    # Empty files get their headers before the first row
+    if self.m_FileX.tell( ) == 0:
+      csv.writer( self.m_FileX ).writerow( self.m_FeatureNames )
+    if self.m_FileY.tell( ) == 0:
+      csv.writer( self.m_FileY ).writerow( [ LABEL_NAME ] )
+  # end def
+
+  def _write_rows( self, records ):
+    if self.m_FileX is None:
+      self._open( )
+    # end if
+    csv.writer( self.m_FileX ).writerows( r[ : -1 ] for r in records )
+    csv.writer( self.m_FileY ).writerows( r[ -1 : ] for r in records )
+    self.m_FileX.flush( )
+    self.m_FileY.flush( )
+  # end def
+
+  def close( self ):
+    super( ).close( )
+    if self.m_FileX is not None:
+      self.m_FileX.close( )
+      self.m_FileY.close( )
+      self.m_FileX = None
+      self.m_FileY = None
+    # end if
+  # end def
+
+# end class
+
+"""
+"""
+class BinaryPlayRecorder( PlayRecorder ):
+
+  '''
+  Appends fixed-width uint8 records to a memory-mappable file ( see
+  load_records ).
+  '''
+  m_Path        = None
+  m_File        = None
+  m_NumFeatures = 0
+
+  def __init__( self, path, num_features = len( FEATURE_NAMES ), buffer_rows = 65536 ):
+    super( ).__init__( buffer_rows )
+    self.m_Path = path
+    self.m_NumFeatures = num_features
+  # end def
+
+  def _open( self ):
+    self.m_File = open( self.m_Path, 'ab' )
+    if self.m_File.tell( ) == 0:
+      self.m_File.write( BINARY_HEADER.pack( BINARY_MAGIC, self.m_NumFeatures ) )
+    else:
+      num_features = read_header( self.m_Path )
+      if num_features != self.m_NumFeatures:
+        raise ValueError(
+          f'{self.m_Path} holds {num_features} features per record, not {self.m_NumFeatures}'
+          )
+      # end if
+    # end if
+  # end def
+
+  def _write_rows( self, records ):
+    if self.m_File is None:
+      self._open( )
+    # end if
+    self.write_array( numpy.asarray( records, dtype = numpy.uint8 ) )
+  # end def
+
+  def write_array( self, records ):
+    '''
+    Writes an already built ( rows, num_features + 1 ) uint8 array,
+    bypassing the row buffer.
+    '''
+    if self.m_File is None:
+      self._open( )
+    # end if
+    if records.ndim != 2 or records.shape[ 1 ] != self.m_NumFeatures + 1:
+      raise ValueError( f'Expected records with {self.m_NumFeatures + 1} columns' )
+    # end if
+    self.m_File.write( numpy.ascontiguousarray( records, dtype = numpy.uint8 ).tobytes( ) )
+    self.m_File.flush( )
+  # end def
+
+  def close( self ):
+    super( ).close( )
+    if self.m_File is not None:
+      self.m_File.close( )
+      self.m_File = None
+    # end if
+  # end def
+
+# end class
+
+def read_header( path ):
+  with open( path, 'rb' ) as f:
+    magic, num_features = BINARY_HEADER.unpack( f.read( BINARY_HEADER.size ) )
+  # end with
+  if magic != BINARY_MAGIC:
+    raise ValueError( f'{path} is not a binary play record file' )
+  # end if
+  return num_features
+# end def
+
+def load_records( path ):
+  '''
+  Memory maps a binary play record file as a ( rows, num_features + 1 )
+  uint8 array; the last column is the label.
+  '''
+  width = read_header( path ) + 1
+  rows = ( os.path.getsize( path ) - BINARY_HEADER.size ) // width
+  return numpy.memmap(
+    path, dtype = numpy.uint8, mode = 'r',
+    offset = BINARY_HEADER.size, shape = ( rows, width )
+    )
+# end def
+
+def export_csv( path, path_x, path_y, chunk_rows = 1 << 20 ):
+  from Features import feature_names_for
+
+  records = load_records( path )
+  names = feature_names_for( records.shape[ 1 ] - 1 )
+  with CsvPlayRecorder( path_x, path_y, feature_names = names ) as recorder:
+    for start in range( 0, records.shape[ 0 ], chunk_rows ):
+      recorder.write( records[ start : start + chunk_rows ].tolist( ) )
+    # end for
+  # end with
+# end def
+
+if __name__ == '__main__':
+  import sys
+
+  if len( sys.argv ) != 4:
+    print( 'Usage: python3', sys.argv[ 0 ], 'records.bin game_x.csv game_y.csv' )
+    sys.exit( 1 )
+  # end if
+  export_csv( sys.argv[ 1 ], sys.argv[ 2 ], sys.argv[ 3 ] )
+# end if
+
+## eof - PlayRecorder.py
@@ -0,0 +1,524 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import math
+import random
+import time
+
+"""
+Raised when the enumeration of a frontier component runs out of time
+"""
+class _OutOfTime( Exception ):
+  pass
+# end class
+
+"""
+Minesweeper logic player: single-cell and subset constraint propagation
+over the revealed numbers, then exact mine probabilities from enumerating
+each independent frontier component, weighted by the global mine count.
+
+Arguments:
+  --time-budget SECONDS   per-move time budget ( default 0.05 )
+  --max-component N       largest component enumerated exactly ( default 48 )
+  --seed N                seed of the player's random choices
+"""
+class Player:
+
+  '''
+  '''
+  m_Marks = None
+  m_Width = 0
+  m_Height = 0
+  m_NumberOfMines = 0
+
+  '''
+  '''
+  def __init__( self, args ):
+    self.m_TimeBudget = 0.05
+    self.m_MaxComponent = 48
+    seed = None
+    k = 0
+    while k < len( args ):
+      if args[ k ] == '--time-budget' and k + 1 < len( args ):
+        self.m_TimeBudget = float( args[ k + 1 ] )
+        k += 2
+      elif args[ k ] == '--max-component' and k + 1 < len( args ):
+        self.m_MaxComponent = int( args[ k + 1 ] )
+        k += 2
+      elif args[ k ] == '--seed' and k + 1 < len( args ):
+        seed = int( args[ k + 1 ] )
+        k += 2
+      else:
+        k += 1
+      # end if
+    # end while
+
+    # Without --seed, seeded from the global generator
+    self.m_Random = random.Random( seed if seed is not None else random.getrandbits( 64 ) )
+    self.m_Values = { }
+    self.m_Flags = set( )
+    self.m_Safe = set( )
+    self.m_Boundary = set( )
+    self.m_Revealed = 0
+    # Enumeration results of frontier components, keyed by their constraints
+    self.m_Components = { }
+  # end def
+
+  '''
+  '''
+  def choose_cell( self, w, h, n ):
+
+    # Init game state
+    if self.m_Marks is None:
+      self.m_Marks = [ [ False for j in range( h ) ] for i in range( w ) ]
+      self.m_Width = w
+      self.m_Height = h
+      self.m_NumberOfMines = n
+      # First play: every cell is equally likely to be a mine
+      return ( self.m_Random.randrange( w ), self.m_Random.randrange( h ) )
+    # end if
+
+    deadline = time.perf_counter( ) + self.m_TimeBudget
+    cell = self._pop_safe( )
+    if cell is not None:
+      return cell
+    # end if
+
+    self._deduce( deadline )
+    cell = self._pop_safe( )
+    if cell is not None:
+      return cell
+    # end if
+
+    return self._least_risky_cell( deadline )
+  # end def
+
+  '''
+  '''
+  def report( self, i, j, n ):
+    if self.m_Marks[ i ][ j ]:
+      return
+    # end if
+    self.m_Marks[ i ][ j ] = True
+    self.m_Values[ ( i, j ) ] = n
+    self.m_Revealed += 1
+    self.m_Safe.discard( ( i, j ) )
+    if n < 9:
+      self.m_Boundary.add( ( i, j ) )
+    # end if
+  # end def
+
+  def _neighbors( self, i, j ):
+    for x in range( max( i - 1, 0 ), min( i + 2, self.m_Width ) ):
+      for y in range( max( j - 1, 0 ), min( j + 2, self.m_Height ) ):
+        if x != i or y != j:
+          yield ( x, y )
+        # end if
+      # end for
+    # end for
+  # end def
+
+  def _is_unknown( self, cell ):
+    return not self.m_Marks[ cell[ 0 ] ][ cell[ 1 ] ] and cell not in self.m_Flags
+  # end def
+
+  def _pop_safe( self ):
+    while len( self.m_Safe ) > 0:
+      cell = self.m_Safe.pop( )
+      if self._is_unknown( cell ):
+        return cell
+      # end if
+    # end while
+    return None
+  # end def
+
+  def _constraints( self ):
+    # ( unknown neighbors, mines left among them ) for every revealed
+    # number that still touches an unknown cell
+    constraints = set( )
+    done = [ ]
+    for ( i, j ) in self.m_Boundary:
+      cells = [ ]
+      mines = 0
+      for cell in self._neighbors( i, j ):
+        if cell in self.m_Flags:
+          mines += 1
+        elif not self.m_Marks[ cell[ 0 ] ][ cell[ 1 ] ]:
+          cells.append( cell )
+        # end if
+      # end for
+      if len( cells ) == 0:
+        done.append( ( i, j ) )
+      else:
+        rem = self.m_Values[ ( i, j ) ] - mines
+        if 0 <= rem <= len( cells ):
+          constraints.add( ( frozenset( cells ), rem ) )
+        # end if
+      # end if
+    # end for
+    self.m_Boundary.difference_update( done )
+    return list( constraints )
+  # end def
+
+  def _settle( self, cells, mines ):
+    # All of cells are mines ( mines = True ) or all are safe
+    changed = False
+    for cell in cells:
+      if mines:
+        if cell not in self.m_Flags:
+          self.m_Flags.add( cell )
+          self.m_Safe.discard( cell )
+          changed = True
+        # end if
+      elif cell not in self.m_Safe:
+        self.m_Safe.add( cell )
+        changed = True
+      # end if
+    # end for
+    return changed
+  # end def
+
+  def _deduce( self, deadline ):
+    changed = True
+    while changed and time.perf_counter( ) < deadline:
+      changed = False
+      constraints = self._constraints( )
+
+      # Single-cell rule
+      for cells, rem in constraints:
+        if rem == 0:
+          changed |= self._settle( cells, False )
+        elif rem == len( cells ):
+          changed |= self._settle( cells, True )
+        # end if
+      # end for
+      if changed:
+        continue
+      # end if
+
+      # Subset rule: if A is inside B, B - A holds rem( B ) - rem( A ) mines
+      by_cell = { }
+      for k, ( cells, rem ) in enumerate( constraints ):
+        for cell in cells:
+          by_cell.setdefault( cell, [ ] ).append( k )
+        # end for
+      # end for
+      for cells_a, rem_a in constraints:
+        others = set( )
+        for cell in cells_a:
+          others.update( by_cell[ cell ] )
+        # end for
+        for k in others:
+          cells_b, rem_b = constraints[ k ]
+          if len( cells_a ) < len( cells_b ) and cells_a < cells_b:
+            diff = cells_b - cells_a
+            if rem_b == rem_a:
+              changed |= self._settle( diff, False )
+            elif rem_b - rem_a == len( diff ):
+              changed |= self._settle( diff, True )
+            # end if
+          # end if
+        # end for
+      # end for
+    # end while
+  # end def
+
+  def _least_risky_cell( self, deadline ):
+    constraints = self._constraints( )
+    frontier = set( )
+    for cells, rem in constraints:
+      frontier.update( cells )
+    # end for
+    mines_left = self.m_NumberOfMines - len( self.m_Flags )
+    unknown = self.m_Width * self.m_Height - self.m_Revealed - len( self.m_Flags )
+    others = unknown - len( frontier )
+
+    try:
+      probs, other_prob = self._exact_probabilities( constraints, mines_left, others, deadline )
+    except _OutOfTime:
+      probs, other_prob = self._estimated_probabilities( constraints, mines_left, unknown )
+    # end try
+
+    # A cell proven safe by the enumeration is played right away
+    cell = self._pop_safe( )
+    if cell is not None:
+      return cell
+    # end if
+
+    best_cell = None
+    best_prob = None
+    for cell, prob in probs.items( ):
+      if best_prob is None or prob < best_prob:
+        best_cell = cell
+        best_prob = prob
+      # end if
+    # end for
+    if others > 0 and ( best_prob is None or other_prob < best_prob ):
+      best_cell = self._random_other_cell( frontier )
+    # end if
+    if best_cell is None:
+      return ( 0, 0 )
+    # end if
+    return best_cell
+  # end def
+
+  def _components( self, constraints ):
+    # Group constraints that share cells ( union-find over cells )
+    parent = { }
+
+    def find( c ):
+      while parent[ c ] != c:
+        parent[ c ] = parent[ parent[ c ] ]
+        c = parent[ c ]
+      # end while
+      return c
+    # end def
+
+    for cells, rem in constraints:
+      first = None
+      for cell in cells:
+        parent.setdefault( cell, cell )
+        if first is None:
+          first = find( cell )
+        else:
+          root = find( cell )
+          if root != first:
+            parent[ root ] = first
+          # end if
+        # end if
+      # end for
+    # end for
+    groups = { }
+    for constraint in constraints:
+      root = find( next( iter( constraint[ 0 ] ) ) )
+      groups.setdefault( root, [ ] ).append( constraint )
+    # end for
+    return list( groups.values( ) )
+  # end def
+
+  def _enumerate( self, constraints, deadline ):
+    '''
+    Counts the solutions of one component by number of mines: returns the
+    cells, counts[ k ] and cell_counts[ k ][ v ] ( solutions with k mines
+    where cell v is a mine ).
+    '''
+    key = frozenset( constraints )
+    if key in self.m_Components:
+      return self.m_Components[ key ]
+    # end if
+
+    # Variables in constraint order, so constraints close early
+    order = [ ]
+    seen = set( )
+    for cells, rem in sorted( constraints, key = lambda c: len( c[ 0 ] ) ):
+      for cell in sorted( cells ):
+        if cell not in seen:
+          seen.add( cell )
+          order.append( cell )
+        # end if
+      # end for
+    # end for
+    n = len( order )
+    if n > self.m_MaxComponent:
+      raise _OutOfTime( )
+    # end if
+    index = { cell: k for k, cell in enumerate( order ) }
+    rems = [ rem for cells, rem in constraints ]
+    var_cons = [ [ ] for k in range( n ) ]
+    unassigned = [ ]
+    for c, ( cells, rem ) in enumerate( constraints ):
+      for cell in cells:
+        var_cons[ index[ cell ] ].append( c )
+      # end for
+      unassigned.append( len( cells ) )
+    # end for
+    assigned = [ 0 ] * len( constraints )
+    assignment = [ 0 ] * n
+    counts = [ 0 ] * ( n + 1 )
+    cell_counts = [ [ 0 ] * n for k in range( n + 1 ) ]
+    visits = [ 0 ]
+
+    def search( v, mines ):
+      visits[ 0 ] += 1
+      if visits[ 0 ] & 1023 == 0 and time.perf_counter( ) > deadline:
+        raise _OutOfTime( )
+      # end if
+      if v == n:
+        counts[ mines ] += 1
+        row = cell_counts[ mines ]
+        for k in range( n ):
+          if assignment[ k ]:
+            row[ k ] += 1
+          # end if
+        # end for
+        return
+      # end if
+      for value in ( 0, 1 ):
+        feasible = True
+        for c in var_cons[ v ]:
+          a = assigned[ c ] + value
+          if a > rems[ c ] or a + unassigned[ c ] - 1 < rems[ c ]:
+            feasible = False
+            break
+          # end if
+        # end for
+        if feasible:
+          for c in var_cons[ v ]:
+            assigned[ c ] += value
+            unassigned[ c ] -= 1
+          # end for
+          assignment[ v ] = value
+          search( v + 1, mines + value )
+          assignment[ v ] = 0
+          for c in var_cons[ v ]:
+            assigned[ c ] -= value
+            unassigned[ c ] += 1
+          # end for
+        # end if
+      # end for
+    # end def
+
+    search( 0, 0 )
+    result = ( order, counts, cell_counts )
+    self.m_Components[ key ] = result
+    return result
+  # end def
+
+  @staticmethod
+  def _log_binomial( n, k ):
+    return math.lgamma( n + 1 ) - math.lgamma( k + 1 ) - math.lgamma( n - k + 1 )
+  # end def
+
+  @staticmethod
+  def _convolve( a, b ):
+    out = [ 0.0 ] * ( len( a ) + len( b ) - 1 )
+    for i, x in enumerate( a ):
+      if x != 0.0:
+        for j, y in enumerate( b ):
+          out[ i + j ] += x * y
+        # end for
+      # end if
+    # end for
+    return out
+  # end def
+
+  def _exact_probabilities( self, constraints, mines_left, others, deadline ):
+    components = [ ]
+    groups = self._components( constraints )
+    # Only the components of the current frontier can be asked for again:
+    # the rest of the memo is dropped, so it does not grow with the game
+    live = { frozenset( group ) for group in groups }
+    self.m_Components = { k: v for k, v in self.m_Components.items( ) if k in live }
+    for group in groups:
+      order, counts, cell_counts = self._enumerate( group, deadline )
+
+      # Cells with the same value in every solution are settled exactly
+      for v, cell in enumerate( order ):
+        if all( cell_counts[ k ][ v ] == 0 for k in range( len( counts ) ) ):
+          self._settle( [ cell ], False )
+        elif all( cell_counts[ k ][ v ] == counts[ k ] for k in range( len( counts ) ) ):
+          self._settle( [ cell ], True )
+        # end if
+      # end for
+
+      # Normalized float copies keep large counts from overflowing
+      scale = float( max( counts ) ) if max( counts ) > 0 else 1.0
+      components.append(
+        (
+          order,
+          [ c / scale for c in counts ],
+          [ [ c / scale for c in row ] for row in cell_counts ]
+          )
+        )
+    # end for
+
+    # Weight of K frontier mines: ways to place the remaining mines outside
+    def weight( K ):
+      m = mines_left - K
+      if m < 0 or m > others:
+        return None
+      # end if
+      return self._log_binomial( others, m )
+    # end def
+
+    max_k = sum( len( c[ 0 ] ) for c in components )
+    logs = [ weight( K ) for K in range( max_k + 1 ) ]
+    valid = [ l for l in logs if l is not None ]
+    if len( valid ) == 0:
+      raise _OutOfTime( )
+    # end if
+    top = max( valid )
+    weights = [ 0.0 if l is None else math.exp( l - top ) for l in logs ]
+
+    # Mine-count distribution of all components but one ( prefix/suffix )
+    dists = [ c[ 1 ] for c in components ]
+    prefix = [ [ 1.0 ] ]
+    for dist in dists:
+      prefix.append( self._convolve( prefix[ -1 ], dist ) )
+    # end for
+    suffix = [ [ 1.0 ] ]
+    for dist in reversed( dists ):
+      suffix.append( self._convolve( suffix[ -1 ], dist ) )
+    # end for
+    suffix.reverse( )
+
+    total = prefix[ -1 ]
+    z = sum( t * weights[ K ] for K, t in enumerate( total ) )
+    if z <= 0.0:
+      raise _OutOfTime( )
+    # end if
+    expected = sum( K * t * weights[ K ] for K, t in enumerate( total ) ) / z
+
+    probs = { }
+    for c, ( order, counts, cell_counts ) in enumerate( components ):
+      rest = self._convolve( prefix[ c ], suffix[ c + 1 ] )
+      # Weight of a component with k mines, given the rest of the board
+      kw = [
+        sum( r * weights[ k + q ] for q, r in enumerate( rest ) )
+        for k in range( len( counts ) )
+        ]
+      for v, cell in enumerate( order ):
+        p = sum( cell_counts[ k ][ v ] * kw[ k ] for k in range( len( counts ) ) ) / z
+        probs[ cell ] = p
+      # end for
+    # end for
+
+    other_prob = ( mines_left - expected ) / others if others > 0 else 1.0
+    return probs, other_prob
+  # end def
+
+  def _estimated_probabilities( self, constraints, mines_left, unknown ):
+    # Out of time: the most pessimistic local density of every cell
+    probs = { }
+    for cells, rem in constraints:
+      p = rem / len( cells )
+      for cell in cells:
+        if p > probs.get( cell, -1.0 ):
+          probs[ cell ] = p
+        # end if
+      # end for
+    # end for
+    other_prob = mines_left / unknown if unknown > 0 else 1.0
+    return probs, other_prob
+  # end def
+
+  def _random_other_cell( self, frontier ):
+    # Unknown cell away from the frontier: rejection sampling, then a scan
+    for attempt in range( 64 ):
+      cell = ( self.m_Random.randrange( self.m_Width ), self.m_Random.randrange( self.m_Height ) )
+      if self._is_unknown( cell ) and cell not in frontier:
+        return cell
+      # end if
+    # end for
+    cells = [
+      ( i, j ) for i in range( self.m_Width ) for j in range( self.m_Height )
+      if self._is_unknown( ( i, j ) ) and ( i, j ) not in frontier
+      ]
+    return self.m_Random.choice( cells ) if len( cells ) > 0 else None
+  # end def
+
+# end class
+
+## eof - ConstraintSolver.py
@@ -32,18 +32,18 @@ class Player:
       self.m_NumberOfMines = n
     # end if
 
-    # Choose a play
-    if len( self.m_Plays ) > 0:
-      o = self.m_Plays[ -1 ]
-      self.m_Plays.pop( )
-      return o
-    else:
-      c = ''
-      while len( c ) != 2:
-        c = input( "Choose a cell: " ).lower( )
-      # end while
-      return ( int( c[ 1 ] ), ord( c[ 0 ] ) - ord( 'a' ) )
-    # end if
+    # Choose a play (cells revealed meanwhile, e.g. by a cascade, are skipped)
+    while len( self.m_Plays ) > 0:
+      o = self.m_Plays.pop( )
+      if not self.m_Marks[ o[ 0 ] ][ o[ 1 ] ]:
+        return o
+      # end if
+    # end while
+    c = ''
+    while len( c ) != 2:
+      c = input( "Choose a cell: " ).lower( )
+    # end while
+    return ( int( c[ 1 ] ), ord( c[ 0 ] ) - ord( 'a' ) )
   # end def
 
   '''
@@ -5,12 +5,27 @@
 ## @author Katheryn Sofia Guasca Chavarro (katheryn.guascar@javeriana.edu.co)
 ## =========================================================================
 
+import hashlib
+import heapq
 import os
 import random
 
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, precision_score
+import numpy
+
+from CellIndex import CellIndex
+from Features import Knowledge, feature_names
+from PlayRecorder import FEATURE_NAMES
+
+# pandas and sklearn are imported where they are needed: a game that
+# loads a cached model and scores with NumPy never pays for them
+
+# Parameters of the fitted model, part of the cache key
+MODEL_SPEC = 'LogisticRegression(max_iter=500)'
+
+# Models trained or loaded in this process, keyed by the content hash of
+# the training files, so a long-lived process (e.g. a benchmark worker)
+# fits or reads each model once
+_MODEL_CACHE = {}
 
 """
 """
@@ -24,36 +39,237 @@ class Player:
   m_Height = 0
   m_NumberOfMines = 0
   brain = None
-  m_RevealedValues = None
   feature_names = None
+  m_Coef = None
+  m_Intercept = None
+  m_SklearnScoring = False
+  m_Incremental = False
+  m_Table = None
+  m_Random = None
+  m_Knowledge = None
+  m_Unknown = None
+  m_Window = 3
+  m_UnknownCount = False
+  m_Risk = None
+  m_RiskHeap = None
 
   '''
   '''
   def __init__( self, args ):
     self.m_ModelAccuracy = None
     self.m_ModelPrecision = None
-    self.brain = self.train_model()
+    self.m_SklearnScoring = '--sklearn-scoring' in args
+    # --incremental refreshes the model from the rows recorded since the
+    # last training ( see Training.py ) instead of refitting from scratch
+    self.m_Incremental = '--incremental' in args and not self.m_SklearnScoring
+    # --seed N makes the random moves reproducible
+    seed = None
+    for k in range( len( args ) - 1 ):
+      if args[ k ] == '--seed':
+        seed = int( args[ k + 1 ] )
+      # end if
+    # end for
+    self.m_Random = random.Random( seed if seed is not None else random.getrandbits( 64 ) )
+    # --lookup-table PATH scores cells with a compiled pattern table ( see
+    # PatternTable.py ); unseen patterns fall back to the linear model
+    if '--lookup-table' in args[ : -1 ]:
+      from PatternTable import PatternTable
+      self.m_Table = PatternTable( args[ args.index( '--lookup-table' ) + 1 ] )
+    # end if
+    # --window K scores the K x K window around each cell ( see
+    # Features.py ) and --unknown-count adds its number of unknown cells;
+    # the default is the 3 x 3 window of game_x.csv
+    if '--window' in args[ : -1 ]:
+      self.m_Window = int( args[ args.index( '--window' ) + 1 ] )
+    # end if
+    self.m_UnknownCount = '--unknown-count' in args
+    names = feature_names( self.m_Window, self.m_UnknownCount )
+    default_features = names == FEATURE_NAMES
+    if not default_features and self.m_Table is not None:
+      raise ValueError( 'Lookup tables hold 3 x 3 patterns only, drop --window / --unknown-count' )
+    # end if
+    # --coeffs PATH plays with a coefficients file ( bias then weights, as
+    # written by code/train_model.py ) and skips the training entirely
+    if '--coeffs' in args[ : -1 ]:
+      self.m_SklearnScoring = False
+      self.m_Incremental = False
+      self._set_model_state( self.load_coeffs( args[ args.index( '--coeffs' ) + 1 ], names ) )
+    elif not default_features:
+      raise ValueError(
+        'game_x.csv holds 3 x 3 windows: other features need --coeffs'
+        ' ( see DatasetGenerator.py --window and code/train_model.py )'
+        )
+    else:
+      # The sklearn scorer needs the fitted estimator, not only the cached
+      # coefficients, so it always fits
+      self.brain = self.train_model( use_cache = not self.m_SklearnScoring )
+    # end if
     self._print_model_metrics()
     self.m_Plays = []
-    self.m_RevealedValues = {}
+    # Unrevealed cells near a revealed one: current mine probabilities
+    # and a lazy min-heap over them
+    self.m_Risk = {}
+    self.m_RiskHeap = []
   # end def
   
   '''
   '''
-  def train_model(self, path_x="../game_x.csv", path_y="../game_y.csv"):
+  def train_model(
+    self, path_x = "../game_x.csv", path_y = "../game_y.csv",
+    path_cache = "../model_cache.npz", use_cache = True
+    ):
     base_dir = os.path.dirname(os.path.abspath(__file__))
     x_path = os.path.abspath(os.path.join(base_dir, path_x))
     y_path = os.path.abspath(os.path.join(base_dir, path_y))
+    cache_path = os.path.abspath(os.path.join(base_dir, path_cache))
+    if self.m_Incremental:
+      key = self._incremental_key( x_path, y_path )
+      # Own cache file, so alternating modes does not evict the full fit
+      root, ext = os.path.splitext( cache_path )
+      cache_path = f'{root}_incremental{ext}'
+    else:
+      key = self._training_key( x_path, y_path )
+    # end if
+
+    if use_cache:
+      if key in _MODEL_CACHE:
+        self._set_model_state( _MODEL_CACHE[ key ] )
+        return None
+      # end if
+      state = self._load_cached_model( cache_path, key )
+      if state is not None:
+        _MODEL_CACHE[ key ] = state
+        self._set_model_state( state )
+        return None
+      # end if
+    # end if
+
+    if self.m_Incremental:
+      from Training import DEFAULT_STATE_PATH, refresh_model
+
+      model, stats = refresh_model( x_path, y_path, state_path = DEFAULT_STATE_PATH )
+      state = dict( model, feature_names = list( FEATURE_NAMES ) )
+      self._save_cached_model( cache_path, key, state )
+      _MODEL_CACHE[ key ] = state
+      self._set_model_state( state )
+      return None
+    # end if
+
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score, precision_score
+
     X = pd.read_csv(x_path)
-    self.feature_names = list(X.columns)
     y = pd.read_csv(y_path)["mina_encontrada"]
     # Max number of iterations to find the model coefficients
     model = LogisticRegression(max_iter=500)
     model.fit(X, y)
     y_pred = model.predict(X)
-    self.m_ModelAccuracy = accuracy_score( y, y_pred )
-    self.m_ModelPrecision = precision_score( y, y_pred, zero_division = 0 )
+    state = {
+      'coef': numpy.asarray( model.coef_[ 0 ], dtype = float ),
+      'intercept': float( model.intercept_[ 0 ] ),
+      'feature_names': list( X.columns ),
+      'accuracy': float( accuracy_score( y, y_pred ) ),
+      'precision': float( precision_score( y, y_pred, zero_division = 0 ) )
+      }
+    self._save_cached_model( cache_path, key, state )
+    _MODEL_CACHE[ key ] = state
+    self._set_model_state( state )
     return model
+  # end def
+
+  @staticmethod
+  def load_coeffs( path, names = FEATURE_NAMES ):
+    with open( path ) as coeffs_fs:
+      coeffs = [ float( v ) for v in coeffs_fs.read( ).split( ) ]
+    # end with
+    if len( coeffs ) != len( names ) + 1:
+      raise ValueError(
+        f'{path}: expected a bias and {len( names )} weights, got {len( coeffs )} values'
+        )
+    # end if
+    return {
+      'coef': numpy.asarray( coeffs[ 1 : ], dtype = float ),
+      'intercept': coeffs[ 0 ],
+      'feature_names': list( names ),
+      'accuracy': None,
+      'precision': None
+      }
+  # end def
+
+  @staticmethod
+  def _training_key( x_path, y_path ):
+    # Content hash of the training files and the model parameters
+    digest = hashlib.sha256( MODEL_SPEC.encode( ) )
+    for path in ( x_path, y_path ):
+      with open( path, 'rb' ) as f:
+        for block in iter( lambda: f.read( 1 << 20 ), b'' ):
+          digest.update( block )
+        # end for
+      # end with
+      digest.update( b'\0' )
+    # end for
+    return digest.hexdigest( )
+  # end def
+
+  @staticmethod
+  def _incremental_key( x_path, y_path ):
+    # Incremental models follow the files as they grow: hashing their
+    # whole content would read every row again, so size and mtime are used
+    digest = hashlib.sha256( ( MODEL_SPEC + ' incremental' ).encode( ) )
+    for path in ( x_path, y_path ):
+      stat = os.stat( path )
+      digest.update( f'{path}:{stat.st_size}:{stat.st_mtime_ns}'.encode( ) )
+    # end for
+    return digest.hexdigest( )
+  # end def
+
+  @staticmethod
+  def _load_cached_model( cache_path, key ):
+    if not os.path.exists( cache_path ):
+      return None
+    # end if
+    try:
+      with numpy.load( cache_path ) as cache:
+        if str( cache[ 'key' ] ) != key:
+          return None
+        # end if
+        return {
+          'coef': cache[ 'coef' ],
+          'intercept': float( cache[ 'intercept' ] ),
+          'feature_names': cache[ 'feature_names' ].tolist( ),
+          'accuracy': float( cache[ 'accuracy' ] ),
+          'precision': float( cache[ 'precision' ] )
+          }
+      # end with
+    except ( OSError, KeyError, ValueError ):
+      # Unreadable or outdated cache files are simply rebuilt
+      return None
+    # end try
+  # end def
+
+  @staticmethod
+  def _save_cached_model( cache_path, key, state ):
+    # Written to a temporary file first, so concurrent games never read a
+    # half written cache
+    tmp_path = f'{cache_path}.{os.getpid( )}.tmp'
+    with open( tmp_path, 'wb' ) as f:
+      numpy.savez(
+        f, key = key, coef = state[ 'coef' ], intercept = state[ 'intercept' ],
+        feature_names = numpy.array( state[ 'feature_names' ] ),
+        accuracy = state[ 'accuracy' ], precision = state[ 'precision' ]
+        )
+    # end with
+    os.replace( tmp_path, cache_path )
+  # end def
+
+  def _set_model_state( self, state ):
+    self.feature_names = state[ 'feature_names' ]
+    self.m_ModelAccuracy = state[ 'accuracy' ]
+    self.m_ModelPrecision = state[ 'precision' ]
+    self.m_Coef = state[ 'coef' ]
+    self.m_Intercept = state[ 'intercept' ]
+  # end def
 
   '''
   '''
@@ -66,22 +282,32 @@ class Player:
       self.m_Width = w
       self.m_Height = h
       self.m_NumberOfMines = n
+      self.m_Knowledge = Knowledge(
+        w, h, self.m_Window, offboard = -1, unknown_count = self.m_UnknownCount
+        )
+      self.m_Unknown = CellIndex( w, h )
       # First play: choose a random cell
-      return ( random.randrange( w ), random.randrange( h ) )
+      return ( self.m_Random.randrange( w ), self.m_Random.randrange( h ) )
     # end if
 
-    # Choose a play using the model
-    if len( self.m_Plays ) > 0:
-      filtered = [ cell for cell in self.m_Plays if not self.m_Marks[ cell[ 0 ] ][ cell[ 1 ] ] ]
-      if len( filtered ) > 0:
-        return self._choose_from_candidates( filtered )
-      else:
-        self.m_Plays = []
-    # end if
+    # Neighbors of a zero are safe, play them first
+    while len( self.m_Plays ) > 0:
+      cell = self.m_Plays.pop( )
+      if not self.m_Marks[ cell[ 0 ] ][ cell[ 1 ] ]:
+        return cell
+      # end if
+    # end while
+
+    # Choose the frontier cell with the lowest probability of a mine
+    # ( heap entries whose cell was revealed or rescored are stale )
+    while len( self.m_RiskHeap ) > 0:
+      prob, cell = self.m_RiskHeap[ 0 ]
+      if self.m_Risk.get( cell ) == prob:
+        return cell
+      # end if
+      heapq.heappop( self.m_RiskHeap )
+    # end while
 
-    candidates = self._collect_frontier_cells( )
-    if len( candidates ) > 0:
-      return self._choose_from_candidates( list( candidates ) )
     # if there are no candidates pick a random unknown cell
     return self._random_unknown_cell( )
   # end def
@@ -90,7 +316,8 @@ class Player:
   '''
   def report( self, i, j, n ):
     self.m_Marks[ i ][ j ] = True
-    self.m_RevealedValues[ ( i, j ) ] = n
+    self.m_Unknown.remove( i, j )
+    self._update_frontier( i, j, n )
     if n == 0:
       for k in range( -1, 2 ):
         for l in range( -1, 2 ):
@@ -121,77 +348,46 @@ class Player:
 
   # end def
 
-  def _collect_frontier_cells( self ):
-    # Collect revealed cells
-    frontier = set()
-    for ( i, j ) in self.m_RevealedValues.keys( ):
-      for cell in self.neighbors( self.m_Width, self.m_Height, i, j ):
-        if not self.m_Marks[ cell[ 0 ] ][ cell[ 1 ] ]:
-          frontier.add( cell )
-        # end if
+  def _update_frontier( self, i, j, n ):
+    # Only the unknown cells whose window holds ( i, j ) change: their
+    # feature rows are read from the knowledge array and scored together
+    self.m_Knowledge.reveal( i, j, n )
+    self.m_Risk.pop( ( i, j ), None )
+    cells_i, cells_j = self.m_Knowledge.unknown_around( i, j )
+    if len( cells_i ) > 0:
+      features = self.m_Knowledge.features( cells_i, cells_j ).astype( float )
+      probs = self._score_cells( features ).tolist( )
+      for cell, prob in zip( zip( cells_i.tolist( ), cells_j.tolist( ) ), probs ):
+        self.m_Risk[ cell ] = prob
+        heapq.heappush( self.m_RiskHeap, ( prob, cell ) )
       # end for
-    # end for
-    return frontier
+    # end if
   # end def
 
-  def _choose_from_candidates( self, candidates ):
-    # pick the one with the lowest probability
-    best_cell = None
-    best_prob = None
-    for cell in candidates:
-      features = self._build_neightbor_vector( cell[ 0 ], cell[ 1 ] )
-      features_df = pd.DataFrame( [ features ], columns = self.feature_names )
-      prob = self.brain.predict_proba( features_df )[ 0 ][ 1 ]
-      if best_prob is None or prob < best_prob:
-        best_prob = prob
-        best_cell = cell
+  def _score_cells( self, features ):
+    # Mine probability for every row of a ( cells, 8 ) feature matrix
+    if self.m_Table is not None:
+      probs = self.m_Table.lookup( features )
+      unseen = numpy.isnan( probs )
+      if unseen.any( ):
+        z = features[ unseen ] @ self.m_Coef + self.m_Intercept
+        probs[ unseen ] = 0.5 * ( 1.0 + numpy.tanh( 0.5 * z ) )
       # end if
-    # end for
-    if best_cell is not None:
-      try:
-        self.m_Plays.remove( best_cell )
-      except ValueError:
-        pass
-      # end try
-      return best_cell
+      return probs
     # end if
-    return self._random_unknown_cell( )
-  # end def
-
-  def _build_neightbor_vector( self, i, j ):
-    # Vector of features for a cell
-    features = []
-    for x in range( i - 1, i + 2 ):
-      for y in range( j - 1, j + 2 ):
-        if x == i and y == j:
-          continue
-        if x >= 0 and x < self.m_Width and y >= 0 and y < self.m_Height:
-          if ( x, y ) in self.m_RevealedValues:
-            features.append( self.m_RevealedValues[ ( x, y ) ] )
-          else:
-            features.append( 9 )
-          #end if
-        else:
-          features.append( -1 )
-        # end if
-      # end for
-    # end for
-    return features
+    if not self.m_SklearnScoring:
+      z = features @ self.m_Coef + self.m_Intercept
+      return 0.5 * ( 1.0 + numpy.tanh( 0.5 * z ) )
+    # end if
+    import pandas as pd
+    features_df = pd.DataFrame( features, columns = self.feature_names )
+    return self.brain.predict_proba( features_df )[ :, 1 ]
   # end def
 
   def _random_unknown_cell( self ):
-    # Pinochazo
-    unknown = []
-    for i in range( self.m_Width ):
-      for j in range( self.m_Height ):
-        if not self.m_Marks[ i ][ j ]:
-          unknown.append( ( i, j ) )
-        # end if
-      # end for
-    # end for
-    if len( unknown ) == 0:
-      return ( 0, 0 )
-    return random.choice( unknown )
+    # Pinochazo: O( 1 ) whatever the size of the board
+    cell = self.m_Unknown.sample( self.m_Random )
+    return ( 0, 0 ) if cell is None else cell
   # end def
 
   '''
@@ -4,39 +4,43 @@
 
 import random
 
+from CellIndex import CellIndex
+
 """
 """
 class Player:
 
   '''
   '''
-  m_Plays = None
+  m_Unknown = None
+  m_Random = None
 
   '''
   '''
   def __init__( self, args ):
-    pass
+    # --seed N makes the sequence of plays reproducible
+    seed = None
+    for k in range( len( args ) - 1 ):
+      if args[ k ] == '--seed':
+        seed = int( args[ k + 1 ] )
+      # end if
+    # end for
+    self.m_Random = random.Random( seed if seed is not None else random.getrandbits( 64 ) )
   # end def
 
   '''
   '''
   def choose_cell( self, w, h, n ):
 
-    # Init game state
-    if self.m_Plays is None:
-      self.m_Plays = []
-      for i in range( w ):
-        for j in range( h ):
-          self.m_Plays += [ ( i, j ) ]
-        # end for
-      # end for
+    # Init game state: every cell is unknown
+    if self.m_Unknown is None:
+      self.m_Unknown = CellIndex( w, h )
     # end if
 
-    # Choose a play
-    random.shuffle( self.m_Plays )
-    if len( self.m_Plays ) > 0:
-      o = self.m_Plays[ -1 ]
-      self.m_Plays.pop( )
+    # Choose a play: a uniformly random unknown cell, never chosen again
+    o = self.m_Unknown.sample( self.m_Random )
+    if o is not None:
+      self.m_Unknown.remove( o[ 0 ], o[ 1 ] )
       return o
     # end if
   # end def
@@ -44,7 +48,8 @@ class Player:
   '''
   '''
   def report( self, i, j, n ):
-    pass
+    # Cells revealed by a cascade are not played again
+    self.m_Unknown.remove( i, j )
   # end def
 
 # end class
@@ -0,0 +1,196 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import contextlib
+import json
+import os
+import sys
+import time
+
+from Board import Board
+
+BASE_DIR = os.path.dirname( os.path.abspath( __file__ ) )
+
+"""
+Line-delimited JSON log of played games: one object per game with the
+board size and storage, the board and player seeds, the player and its arguments and
+the sequence of clicks, enough to re-execute the game exactly.
+"""
+class ReplayLog:
+
+  '''
+  '''
+  m_File = None
+
+  def __init__( self, path ):
+    self.m_File = open( path, 'a' )
+  # end def
+
+  def __enter__( self ):
+    return self
+  # end def
+
+  def __exit__( self, exc_type, exc_value, traceback ):
+    self.close( )
+  # end def
+
+  def write( self, record ):
+    self.m_File.write( json.dumps( record, separators = ( ',', ':' ) ) + '\n' )
+  # end def
+
+  def close( self ):
+    if self.m_File is not None:
+      self.m_File.close( )
+      self.m_File = None
+    # end if
+  # end def
+
+# end class
+
+def make_record( board, board_seed, player_path, player_args, player_seed, cascade, clicks ):
+  return {
+    'width': board.width( ),
+    'height': board.height( ),
+    'mines': board.number_of_mines( ),
+    'board_seed': board_seed,
+    'board': board.storage( ),
+    'player': os.path.relpath( os.path.abspath( player_path ), BASE_DIR ),
+    'player_args': list( player_args ),
+    'player_seed': player_seed,
+    'cascade': cascade,
+    'clicks': [ [ i, j ] for ( i, j ) in clicks ],
+    'won': board.have_won( ),
+    'plays': board.play_count( )
+    }
+# end def
+
+def read_log( path ):
+  with open( path ) as f:
+    for line in f:
+      if line.strip( ):
+        yield json.loads( line )
+      # end if
+    # end for
+  # end with
+# end def
+
+def new_board( record ):
+  '''
+  Empty board of the logged size, seed and storage: a sparse board places
+  its mines differently from a dense one for the same seed
+  '''
+  w, h, m = record[ 'width' ], record[ 'height' ], record[ 'mines' ]
+  storage = record.get( 'board', { 'kind': 'dense' } )
+  if storage[ 'kind' ] == 'sparse':
+    from SparseBoard import SparseBoard
+    return SparseBoard(
+      w, h, m, record_play_data = False, seed = record[ 'board_seed' ],
+      chunk_size = storage[ 'chunk_size' ]
+      )
+  elif storage[ 'kind' ] == 'compact':
+    from CompactBoard import CompactBoard
+    return CompactBoard( w, h, m, record_play_data = False, seed = record[ 'board_seed' ] )
+  elif storage[ 'kind' ] != 'dense':
+    raise ValueError( f"Unknown board storage {storage[ 'kind' ]}" )
+  # end if
+  return Board( w, h, m, record_play_data = False, seed = record[ 'board_seed' ] )
+# end def
+
+def replay_clicks( record ):
+  '''
+  Re-applies the logged clicks to the same board, without the player
+  '''
+  board = new_board( record )
+  for ( i, j ) in record[ 'clicks' ]:
+    board.click( i, j, cascade = record[ 'cascade' ] )
+  # end for
+  return board, [ tuple( c ) for c in record[ 'clicks' ] ]
+# end def
+
+def replay_player( record ):
+  '''
+  Plays the game again with the logged player and seeds
+  '''
+  from MineSweeper import ImportLibrary
+
+  w, h, m = record[ 'width' ], record[ 'height' ], record[ 'mines' ]
+  with open( os.devnull, 'w' ) as devnull, contextlib.redirect_stdout( devnull ):
+    player_lib = ImportLibrary( 'Player', os.path.join( BASE_DIR, record[ 'player' ] ) )
+    board = new_board( record )
+    player = player_lib.Player(
+      record[ 'player_args' ] + [ '--seed', str( record[ 'player_seed' ] ) ]
+      )
+    clicks = [ ]
+    while not board.have_finished( ):
+      i, j = player.choose_cell( w, h, m )
+      clicks.append( ( i, j ) )
+      if record[ 'cascade' ]:
+        for ( x, y, n ) in board.click( i, j, cascade = True ):
+          player.report( x, y, n )
+        # end for
+      else:
+        player.report( i, j, board.click( i, j ) )
+      # end if
+    # end while
+  # end with
+  return board, clicks
+# end def
+
+if __name__ == '__main__':
+  import argparse
+
+  parser = argparse.ArgumentParser( description = 'Re-execute logged MineSweeper games.' )
+  parser.add_argument( 'log' )
+  parser.add_argument( '--game', type = int, default = None, help = 'index of a single game' )
+  parser.add_argument(
+    '--with-player', action = 'store_true',
+    help = 'play again with the logged player instead of re-applying the clicks'
+    )
+  parser.add_argument( '--profile', action = 'store_true', help = 'run under cProfile' )
+  args = parser.parse_args( )
+
+  replay = replay_player if args.with_player else replay_clicks
+  profiler = None
+  if args.profile:
+    import cProfile
+    profiler = cProfile.Profile( )
+  # end if
+
+  mismatches = 0
+  for index, record in enumerate( read_log( args.log ) ):
+    if args.game is not None and index != args.game:
+      continue
+    # end if
+    start = time.perf_counter( )
+    if profiler is not None:
+      profiler.enable( )
+    # end if
+    board, clicks = replay( record )
+    if profiler is not None:
+      profiler.disable( )
+    # end if
+    seconds = time.perf_counter( ) - start
+    same = (
+      board.have_won( ) == record[ 'won' ]
+      and board.play_count( ) == record[ 'plays' ]
+      and [ list( c ) for c in clicks ] == record[ 'clicks' ]
+      )
+    if not same:
+      mismatches += 1
+    # end if
+    print(
+      f"game {index}: {'won' if board.have_won( ) else 'lost'} in {board.play_count( )} plays,"
+      f" {seconds * 1e3:.2f} ms, {'matches log' if same else 'DIFFERS FROM LOG'}"
+      )
+  # end for
+
+  if profiler is not None:
+    import pstats
+    pstats.Stats( profiler ).sort_stats( 'cumulative' ).print_stats( 25 )
+  # end if
+  sys.exit( 1 if mismatches > 0 else 0 )
+# end if
+
+## eof - Replay.py
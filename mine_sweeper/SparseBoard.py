@@ -0,0 +1,274 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import random
+
+import numpy
+
+from Board import Board
+from Features import OFF_BOARD
+
+CHUNK_SIZE = 256
+
+"""
+Mine counts of a huge board, generated chunk by chunk on first access.
+The number of mines of every chunk is drawn up front, their positions only when the chunk or one of its
+neighbors is needed, from a generator seeded with ( seed, chunk ).
+"""
+class LazyLayout:
+
+  '''
+  '''
+  shape = None
+
+  m_Seed       = 0
+  m_ChunkSize  = CHUNK_SIZE
+  m_ChunkMines = None
+  m_Masks      = None
+  m_Counts     = None
+
+  def __init__( self, w, h, n, seed, chunk_size = CHUNK_SIZE ):
+    if n > w * h:
+      raise ValueError( f'Cannot place {n} mines in a {w}x{h} board' )
+    # end if
+    self.shape = ( w, h )
+    self.m_Seed = seed
+    self.m_ChunkSize = chunk_size
+    cx = numpy.arange( 0, w, chunk_size )
+    cy = numpy.arange( 0, h, chunk_size )
+    sizes = numpy.outer( numpy.minimum( w - cx, chunk_size ), numpy.minimum( h - cy, chunk_size ) )
+    rng = numpy.random.default_rng( seed )
+    self.m_ChunkMines = LazyLayout._split_mines( rng, sizes.ravel( ), n ).reshape( sizes.shape )
+    self.m_Masks = { }
+    self.m_Counts = { }
+  # end def
+
+  @staticmethod
+  def _split_mines( rng, sizes, n ):
+    # Number of mines of every chunk. NumPy's hypergeometric sampler is
+    # limited to 10^9 cells; beyond that the split is multinomial, with
+    # the ( rare ) excess of full chunks moved to chunks with room left
+    if sizes.sum( ) < 10 ** 9:
+      return rng.multivariate_hypergeometric( sizes, n, method = 'marginals' )
+    # end if
+    counts = numpy.zeros( sizes.shape[ 0 ], dtype = numpy.int64 )
+    while n > 0:
+      room = sizes - counts
+      counts += rng.multinomial( n, room / room.sum( ) )
+      excess = numpy.maximum( counts - sizes, 0 )
+      counts -= excess
+      n = int( excess.sum( ) )
+    # end while
+    return counts
+  # end def
+
+  def __getitem__( self, key ):
+    i, j = key
+    c = self.m_ChunkSize
+    return self.chunk_counts( i // c, j // c )[ i % c, j % c ]
+  # end def
+
+  def chunk_shape( self, cx, cy ):
+    c = self.m_ChunkSize
+    return ( min( c, self.shape[ 0 ] - cx * c ), min( c, self.shape[ 1 ] - cy * c ) )
+  # end def
+
+  def chunk_mask( self, cx, cy ):
+    # Boolean mine mask of a chunk, kept bit-packed once generated
+    packed = self.m_Masks.get( ( cx, cy ) )
+    shape = self.chunk_shape( cx, cy )
+    if packed is None:
+      rng = numpy.random.default_rng( ( self.m_Seed, cx, cy ) )
+      mask = numpy.zeros( shape[ 0 ] * shape[ 1 ], dtype = bool )
+      mask[ rng.choice( mask.shape[ 0 ], self.m_ChunkMines[ cx, cy ], replace = False ) ] = True
+      packed = numpy.packbits( mask )
+      self.m_Masks[ ( cx, cy ) ] = packed
+    # end if
+    return numpy.unpackbits( packed, count = shape[ 0 ] * shape[ 1 ] ).view( bool ).reshape( shape )
+  # end def
+
+  def chunk_counts( self, cx, cy ):
+    counts = self.m_Counts.get( ( cx, cy ) )
+    if counts is None:
+      counts = self._compute_counts( cx, cy )
+      self.m_Counts[ ( cx, cy ) ] = counts
+    # end if
+    return counts
+  # end def
+
+  def _compute_counts( self, cx, cy ):
+    # The chunk with a one cell border taken from its neighbor chunks,
+    # then the same shifted sum as Board._count_neighbors
+    w, h = self.chunk_shape( cx, cy )
+    padded = numpy.zeros( ( w + 2, h + 2 ), dtype = numpy.int8 )
+    nx, ny = self.m_ChunkMines.shape
+    for dx in ( -1, 0, 1 ):
+      for dy in ( -1, 0, 1 ):
+        if 0 <= cx + dx < nx and 0 <= cy + dy < ny:
+          mask = self.chunk_mask( cx + dx, cy + dy )
+          # Rows / columns of the neighbor that fall inside the border
+          sx = slice( None ) if dx == 0 else ( slice( -1, None ) if dx < 0 else slice( 0, 1 ) )
+          sy = slice( None ) if dy == 0 else ( slice( -1, None ) if dy < 0 else slice( 0, 1 ) )
+          px = slice( 1, w + 1 ) if dx == 0 else ( slice( 0, 1 ) if dx < 0 else slice( w + 1, w + 2 ) )
+          py = slice( 1, h + 1 ) if dy == 0 else ( slice( 0, 1 ) if dy < 0 else slice( h + 1, h + 2 ) )
+          padded[ px, py ] = mask[ sx, sy ]
+        # end if
+      # end for
+    # end for
+    counts = numpy.zeros( ( w, h ), dtype = numpy.int8 )
+    for k in range( 3 ):
+      for l in range( 3 ):
+        if k != 1 or l != 1:
+          counts += padded[ k : k + w, l : l + h ]
+        # end if
+      # end for
+    # end for
+    counts[ padded[ 1 : w + 1, 1 : h + 1 ] == 1 ] = 9
+    return counts
+  # end def
+
+  def tolist( self ):
+    w, h = self.shape
+    return [ [ int( self[ i, j ] ) for j in range( h ) ] for i in range( w ) ]
+  # end def
+
+# end class
+
+"""
+Revealed flags as one bit per cell, in chunks allocated on first write.
+"""
+class RevealedBitmap:
+
+  '''
+  '''
+  shape = None
+
+  m_ChunkSize = CHUNK_SIZE
+  m_Chunks    = None
+
+  def __init__( self, w, h, chunk_size = CHUNK_SIZE ):
+    self.shape = ( w, h )
+    self.m_ChunkSize = chunk_size
+    self.m_Chunks = { }
+  # end def
+
+  def __getitem__( self, key ):
+    i, j = key
+    c = self.m_ChunkSize
+    bits = self.m_Chunks.get( ( i // c, j // c ) )
+    if bits is None:
+      return False
+    # end if
+    k = ( i % c ) * c + j % c
+    return ( ( bits[ k >> 3 ] >> ( k & 7 ) ) & 1 ) == 1
+  # end def
+
+  def __setitem__( self, key, value ):
+    i, j = key
+    c = self.m_ChunkSize
+    bits = self.m_Chunks.get( ( i // c, j // c ) )
+    if bits is None:
+      if not value:
+        return
+      # end if
+      bits = bytearray( ( c * c + 7 ) // 8 )
+      self.m_Chunks[ ( i // c, j // c ) ] = bits
+    # end if
+    k = ( i % c ) * c + j % c
+    if value:
+      bits[ k >> 3 ] |= 1 << ( k & 7 )
+    else:
+      bits[ k >> 3 ] &= ~( 1 << ( k & 7 ) ) & 0xFF
+    # end if
+  # end def
+
+  def tolist( self ):
+    w, h = self.shape
+    return [ [ self[ i, j ] for j in range( h ) ] for i in range( w ) ]
+  # end def
+
+# end class
+
+"""
+Board for very large grids: same API as Board, but memory grows with the
+area the player touches instead of w x h.
+"""
+class SparseBoard( Board ):
+
+  '''
+  '''
+  # Larger boards are summarized instead of drawn
+  MAX_RENDER_CELLS = 64 * 64
+
+  m_ChunkSize = CHUNK_SIZE
+
+  def __init__(
+    self, w, h, n, record_play_data = True, recorder = None, seed = None,
+    chunk_size = CHUNK_SIZE
+    ):
+    if seed is None:
+      seed = random.getrandbits( 64 )
+    # end if
+    self.m_ChunkSize = chunk_size
+    super( ).__init__(
+      w, h, n, record_play_data = record_play_data, recorder = recorder,
+      layout = LazyLayout( w, h, n, seed, chunk_size )
+      )
+  # end def
+
+  def storage( self ):
+    return { 'kind': 'sparse', 'chunk_size': self.m_ChunkSize }
+  # end def
+
+  def _new_patches( self, w, h ):
+    return RevealedBitmap( w, h, self.m_ChunkSize )
+  # end def
+
+  def touched_chunks( self ):
+    # Number of chunks with generated mines, computed counts and revealed
+    # cells
+    return (
+      len( self.m_Mines.m_Masks ), len( self.m_Mines.m_Counts ), len( self.m_Patches.m_Chunks )
+      )
+  # end def
+
+  def _play_features( self, cells_i, cells_j ):
+    # The lazy layout cannot be padded whole: a 3 x 3 block is read
+    # around every played cell
+    w, h = self.width( ), self.height( )
+    features = numpy.full( ( len( cells_i ), 3, 3 ), OFF_BOARD, dtype = numpy.int8 )
+    for k, ( i, j ) in enumerate( zip( cells_i.tolist( ), cells_j.tolist( ) ) ):
+      for x in range( max( i - 1, 0 ), min( i + 2, w ) ):
+        for y in range( max( j - 1, 0 ), min( j + 2, h ) ):
+          features[ k, x - i + 1, y - j + 1 ] = self.m_Mines[ x, y ]
+        # end for
+      # end for
+    # end for
+    return numpy.delete( features.reshape( -1, 9 ), 4, axis = 1 )
+  # end def
+
+  def _row_values( self, j, i0, i1 ):
+    return [ int( self.m_Mines[ i, j ] ) for i in range( i0, i1 ) ]
+  # end def
+
+  def _row_revealed( self, j, i0, i1 ):
+    return [ self.m_Patches[ i, j ] for i in range( i0, i1 ) ]
+  # end def
+
+  def __str__( self ):
+    # Use render( i0, j0, width, height ) to draw a window of a large board
+    w, h = self.width( ), self.height( )
+    if w * h <= self.MAX_RENDER_CELLS:
+      return super( ).__str__( )
+    # end if
+    return (
+      f'SparseBoard {w}x{h}, {self.m_NumberOfMines} mines,'
+      f' {w * h - self.m_Unrevealed} cells revealed\n'
+      )
+  # end def
+
+# end class
+
+## eof - SparseBoard.py
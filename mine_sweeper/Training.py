@@ -0,0 +1,344 @@
+## =========================================================================
+## @author Simon Díaz Monroy (simondiaz@javeriana.edu.co)
+## @author Katheryn Sofia Guasca Chavarro (ksofia.guasca@javeriana.edu.co)
+## =========================================================================
+
+import hashlib
+import itertools
+import os
+import time
+
+import numpy
+
+from PlayRecorder import (
+  BINARY_HEADER, DEFAULT_X_PATH, DEFAULT_Y_PATH, FEATURE_NAMES, load_records, read_header
+  )
+
+DEFAULT_STATE_PATH = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'training_state.npz' )
+
+# Feature values go from -1 ( off board ) to 9 ( unknown / mine ): 11 symbols
+ALPHABET = 11
+VALUE_OFFSET = 1
+
+def encode_patterns( features ):
+  '''
+  Base-11 code of every row of a ( rows, features ) matrix; the first
+  feature is the least significant digit.
+  '''
+  digits = numpy.asarray( features, dtype = numpy.int64 ) + VALUE_OFFSET
+  weights = ALPHABET ** numpy.arange( digits.shape[ 1 ], dtype = numpy.int64 )
+  return digits @ weights
+# end def
+
+def decode_patterns( codes, num_features = len( FEATURE_NAMES ) ):
+  codes = numpy.asarray( codes, dtype = numpy.int64 )
+  digits = numpy.empty( ( codes.shape[ 0 ], num_features ), dtype = numpy.int64 )
+  for k in range( num_features ):
+    digits[ :, k ] = codes % ALPHABET
+    codes = codes // ALPHABET
+  # end for
+  return digits - VALUE_OFFSET
+# end def
+
+"""
+Weighted counts of the distinct ( pattern, label ) pairs seen so far, plus
+how far each source file has been read, so a refresh only reads new rows.
+"""
+class PatternCounts:
+
+  '''
+  '''
+  m_Codes     = None
+  m_Negatives = None
+  m_Positives = None
+  m_Offsets   = None
+  m_Signature = None
+
+  def __init__( self ):
+    self.m_Codes = numpy.zeros( 0, dtype = numpy.int64 )
+    self.m_Negatives = numpy.zeros( 0, dtype = numpy.int64 )
+    self.m_Positives = numpy.zeros( 0, dtype = numpy.int64 )
+    self.m_Offsets = ( 0, 0 )
+    self.m_Signature = ''
+  # end def
+
+  def rows( self ):
+    return int( self.m_Negatives.sum( ) + self.m_Positives.sum( ) )
+  # end def
+
+  def add( self, features, labels ):
+    # Deduplicate the chunk first, then merge it with the counts so far
+    codes = encode_patterns( features ) * 2 + ( numpy.asarray( labels ) != 0 )
+    keys, counts = numpy.unique( codes, return_counts = True )
+    old = numpy.concatenate( ( self.m_Codes * 2, self.m_Codes * 2 + 1 ) )
+    old_counts = numpy.concatenate( ( self.m_Negatives, self.m_Positives ) )
+    keep = old_counts > 0
+    keys, inverse = numpy.unique(
+      numpy.concatenate( ( old[ keep ], keys ) ), return_inverse = True
+      )
+    totals = numpy.bincount(
+      inverse, weights = numpy.concatenate( ( old_counts[ keep ], counts ) )
+      ).astype( numpy.int64 )
+
+    self.m_Codes, index = numpy.unique( keys // 2, return_inverse = True )
+    self.m_Negatives = numpy.zeros( self.m_Codes.shape[ 0 ], dtype = numpy.int64 )
+    self.m_Positives = numpy.zeros( self.m_Codes.shape[ 0 ], dtype = numpy.int64 )
+    positive = ( keys % 2 ) == 1
+    numpy.add.at( self.m_Negatives, index[ ~positive ], totals[ ~positive ] )
+    numpy.add.at( self.m_Positives, index[ positive ], totals[ positive ] )
+  # end def
+
+  def training_set( self ):
+    # One row per ( pattern, label ) present, weighted by its count
+    negative = self.m_Negatives > 0
+    positive = self.m_Positives > 0
+    codes = numpy.concatenate( ( self.m_Codes[ negative ], self.m_Codes[ positive ] ) )
+    labels = numpy.concatenate(
+      ( numpy.zeros( negative.sum( ), dtype = int ), numpy.ones( positive.sum( ), dtype = int ) )
+      )
+    weights = numpy.concatenate( ( self.m_Negatives[ negative ], self.m_Positives[ positive ] ) )
+    return decode_patterns( codes ), labels, weights.astype( float )
+  # end def
+
+  def save( self, path, model = None ):
+    arrays = {
+      'codes': self.m_Codes, 'negatives': self.m_Negatives, 'positives': self.m_Positives,
+      'offsets': numpy.array( self.m_Offsets, dtype = numpy.int64 ),
+      'signature': self.m_Signature
+      }
+    if model is not None:
+      arrays.update(
+        coef = model[ 'coef' ], intercept = model[ 'intercept' ],
+        accuracy = model[ 'accuracy' ], precision = model[ 'precision' ]
+        )
+    # end if
+    tmp_path = f'{path}.{os.getpid( )}.tmp'
+    with open( tmp_path, 'wb' ) as f:
+      numpy.savez( f, **arrays )
+    # end with
+    os.replace( tmp_path, path )
+  # end def
+
+  @staticmethod
+  def load( path ):
+    # Returns the counts and the last fitted model ( or None )
+    counts = PatternCounts( )
+    model = None
+    if os.path.exists( path ):
+      with numpy.load( path ) as state:
+        counts.m_Codes = state[ 'codes' ]
+        counts.m_Negatives = state[ 'negatives' ]
+        counts.m_Positives = state[ 'positives' ]
+        counts.m_Offsets = tuple( int( v ) for v in state[ 'offsets' ] )
+        counts.m_Signature = str( state[ 'signature' ] )
+        if 'coef' in state.files:
+          model = {
+            'coef': state[ 'coef' ], 'intercept': float( state[ 'intercept' ] ),
+            'accuracy': float( state[ 'accuracy' ] ), 'precision': float( state[ 'precision' ] )
+            }
+        # end if
+      # end with
+    # end if
+    return counts, model
+  # end def
+
+# end class
+
+def _source_signature( paths, consumed ):
+  # Identifies the files through the first bytes already read: appending
+  # keeps the signature, rewriting them from scratch changes it
+  digest = hashlib.sha256( )
+  for path, size in zip( paths, consumed ):
+    with open( path, 'rb' ) as f:
+      digest.update( f.read( min( size, 1 << 16 ) ) )
+    # end with
+  # end for
+  return digest.hexdigest( )
+# end def
+
+def _consumed_bytes( offsets, records_path ):
+  if records_path is None:
+    return offsets
+  # end if
+  return ( BINARY_HEADER.size + offsets[ 0 ] * ( read_header( records_path ) + 1 ), )
+# end def
+
+def _parse_csv_lines( lines ):
+  fields = b','.join( line.strip( ) for line in lines ).split( b',' )
+  return numpy.array( fields ).astype( numpy.int64 ).reshape( len( lines ), -1 )
+# end def
+
+def read_csv_chunks( path_x, path_y, offsets, chunk_rows ):
+  '''
+  Yields ( features, labels, new offsets ) chunks of the rows appended to
+  the CSV pair after the given byte offsets. Only complete lines are read.
+  '''
+  with open( path_x, 'rb' ) as fx, open( path_y, 'rb' ) as fy:
+    for f, offset in ( ( fx, offsets[ 0 ] ), ( fy, offsets[ 1 ] ) ):
+      if offset == 0:
+        f.readline( )
+      else:
+        f.seek( offset )
+      # end if
+    # end for
+    while True:
+      lines_x = list( itertools.islice( fx, chunk_rows ) )
+      lines_y = list( itertools.islice( fy, len( lines_x ) ) )
+      rows = min( len( lines_x ), len( lines_y ) )
+      while rows > 0 and not ( lines_x[ rows - 1 ].endswith( b'\n' ) and lines_y[ rows - 1 ].endswith( b'\n' ) ):
+        rows -= 1
+      # end while
+      if rows == 0:
+        return
+      # end if
+      offsets = (
+        fx.tell( ) - sum( len( l ) for l in lines_x[ rows : ] ),
+        fy.tell( ) - sum( len( l ) for l in lines_y[ rows : ] )
+        )
+      yield (
+        _parse_csv_lines( lines_x[ : rows ] ),
+        _parse_csv_lines( lines_y[ : rows ] )[ :, 0 ],
+        offsets
+        )
+      if rows < len( lines_x ):
+        return
+      # end if
+      fx.seek( offsets[ 0 ] )
+      fy.seek( offsets[ 1 ] )
+    # end while
+  # end with
+# end def
+
+def check_record_file( path ):
+  # Patterns are base-11 codes of exactly the n1..n8 features: wider
+  # windows or extra features would overflow or be misread
+  num_features = read_header( path )
+  if num_features != len( FEATURE_NAMES ):
+    raise ValueError(
+      f'{path} holds {num_features} features per record; training needs'
+      f' {len( FEATURE_NAMES )} ( DatasetGenerator.py without --window / --unknown-count )'
+      )
+  # end if
+# end def
+
+def read_record_chunks( path, offset, chunk_rows ):
+  # Same as read_csv_chunks for a binary record file; offsets are in rows
+  check_record_file( path )
+  records = load_records( path )
+  for start in range( offset, records.shape[ 0 ], chunk_rows ):
+    chunk = numpy.asarray( records[ start : start + chunk_rows ], dtype = numpy.int64 )
+    yield chunk[ :, : -1 ], chunk[ :, -1 ], ( start + chunk.shape[ 0 ], 0 )
+  # end for
+# end def
+
+def fit_counts( counts, warm_start = None, max_iter = 500 ):
+  '''
+  Weighted logistic regression on the distinct patterns. It optimizes the
+  same objective as a fit on every recorded row, and is warm started from
+  the previous coefficients when given.
+  '''
+  from sklearn.linear_model import LogisticRegression
+
+  X, y, weights = counts.training_set( )
+  model = LogisticRegression( max_iter = max_iter, warm_start = warm_start is not None )
+  if warm_start is not None and len( warm_start[ 'coef' ] ) == X.shape[ 1 ]:
+    model.coef_ = numpy.asarray( warm_start[ 'coef' ], dtype = float ).reshape( 1, -1 )
+    model.intercept_ = numpy.array( [ warm_start[ 'intercept' ] ], dtype = float )
+  # end if
+  model.fit( X, y, sample_weight = weights )
+
+  # Weighted training metrics, as if computed row by row
+  predicted = model.predict( X )
+  correct = weights[ predicted == y ].sum( )
+  true_positives = weights[ ( predicted == 1 ) & ( y == 1 ) ].sum( )
+  predicted_positives = weights[ predicted == 1 ].sum( )
+  return {
+    'coef': numpy.asarray( model.coef_[ 0 ], dtype = float ),
+    'intercept': float( model.intercept_[ 0 ] ),
+    'accuracy': float( correct / weights.sum( ) ),
+    'precision': float( true_positives / predicted_positives ) if predicted_positives > 0 else 0.0
+    }
+# end def
+
+def refresh_model(
+  path_x = DEFAULT_X_PATH, path_y = DEFAULT_Y_PATH, records_path = None,
+  state_path = DEFAULT_STATE_PATH, chunk_rows = 1 << 18
+  ):
+  '''
+  Streams the rows added since the last refresh into the pattern counts,
+  refits the model from the previous coefficients and saves both. Returns
+  the model and a few statistics.
+  '''
+  start = time.perf_counter( )
+  if records_path is not None:
+    check_record_file( records_path )
+  # end if
+  sources = [ records_path ] if records_path is not None else [ path_x, path_y ]
+  counts, model = PatternCounts.load( state_path )
+  consumed = _consumed_bytes( counts.m_Offsets, records_path )
+  if (
+    any( os.path.getsize( p ) < c for p, c in zip( sources, consumed ) )
+    or counts.m_Signature != _source_signature( sources, consumed )
+    ):
+    # Different ( or rewritten ) training files: start over
+    counts, model = PatternCounts( ), None
+  # end if
+
+  if records_path is not None:
+    chunks = read_record_chunks( records_path, counts.m_Offsets[ 0 ], chunk_rows )
+  else:
+    chunks = read_csv_chunks( path_x, path_y, counts.m_Offsets, chunk_rows )
+  # end if
+  new_rows = 0
+  for features, labels, offsets in chunks:
+    counts.add( features, labels )
+    counts.m_Offsets = offsets
+    new_rows += features.shape[ 0 ]
+  # end for
+
+  if new_rows > 0 or model is None:
+    model = fit_counts( counts, warm_start = model )
+  # end if
+  counts.m_Signature = _source_signature(
+    sources, _consumed_bytes( counts.m_Offsets, records_path )
+    )
+  counts.save( state_path, model )
+  stats = {
+    'new_rows': new_rows,
+    'rows': counts.rows( ),
+    'patterns': int( counts.m_Codes.shape[ 0 ] ),
+    'seconds': time.perf_counter( ) - start
+    }
+  return model, stats
+# end def
+
+if __name__ == '__main__':
+  import argparse
+
+  parser = argparse.ArgumentParser(
+    description = 'Incrementally train the LogisticRegressionBot model from recorded plays.'
+    )
+  parser.add_argument( '--x', default = DEFAULT_X_PATH, help = 'features CSV' )
+  parser.add_argument( '--y', default = DEFAULT_Y_PATH, help = 'labels CSV' )
+  parser.add_argument( '--records', default = None, help = 'binary record file instead of the CSVs' )
+  parser.add_argument( '--state', default = DEFAULT_STATE_PATH )
+  parser.add_argument( '--chunk-rows', type = int, default = 1 << 18 )
+  args = parser.parse_args( )
+  if args.records is not None:
+    try:
+      check_record_file( args.records )
+    except ValueError as error:
+      parser.error( str( error ) )
+    # end try
+  # end if
+
+  model, stats = refresh_model( args.x, args.y, args.records, args.state, args.chunk_rows )
+  print(
+    f"{stats[ 'new_rows' ]} new rows, {stats[ 'rows' ]} rows in {stats[ 'patterns' ]} patterns,"
+    f" {stats[ 'seconds' ]:.3f} s"
+    )
+  print( f"Accuracy: {model[ 'accuracy' ]:.4f} Precision: {model[ 'precision' ]:.4f}" )
+  print( 'Intercept:', model[ 'intercept' ], 'Coefficients:', model[ 'coef' ].tolist( ) )
+# end if
+
+## eof - Training.py